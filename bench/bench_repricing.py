@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the stock repricing pipeline against the local Cardmarket stand-in.
+
+    python -m bench.bench_repricing --sizes 10000 100000 500000
+    python -m bench.bench_repricing --compare bench/baseline.json
+    python -m bench.bench_repricing --output bench/baseline.json
+
+Each stage of a price update (fetching the stock file, calculating new
+prices from the price guide, the price changes table and uploading the
+changes) is timed per stock size, and run again under tracemalloc for its
+peak memory. Run from the repository root.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from unittest import mock
+
+import tabulate as tb
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pymkm.pymkm_app import PyMkmApp
+from pymkm.pymkm_stock_table import PyMkmStockTable
+
+STAGES = [
+    "get_stock_as_file_to_cache",
+    "calculate_new_prices_for_stock",
+    "display_price_changes_table",
+    "set_stock",
+]
+DEFAULT_SIZES = [10000, 100000, 500000]
+
+
+@contextlib.contextmanager
+def standin_server(stock_size, num_products):
+    """A stand-in server in its own process, so it is not part of the measurements."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "pymkm.pymkm_standin_server",
+            "--port",
+            "0",
+            "--stock",
+            str(stock_size),
+            "--products",
+            str(num_products),
+            "--request-limit",
+            str(10**9),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        base_url = process.stdout.readline().split()[-1]
+        # have the stand-in build its price guide files before anything is timed
+        for resource in ("priceguide", "productlist"):
+            urllib.request.urlopen(f"{base_url}/{resource}").read()
+        # authlib's async client refuses plain http URLs otherwise
+        with mock.patch.dict(os.environ, {"AUTHLIB_INSECURE_TRANSPORT": "1"}):
+            yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def bench_config(base_url, cache_dir):
+    with open("config_template.json", "r") as template_config_file:
+        config = json.load(template_config_file)
+    config.update(
+        {
+            "app_token": "bench",
+            "app_secret": "bench",
+            "access_token": "bench",
+            "access_token_secret": "bench",
+            "base_url": base_url,
+            "price_source": "price_guide",
+            "local_cache_filename": os.path.join(cache_dir, "local_pymkm_data.db"),
+            "api_cache_enabled": False,
+            "api_requests_per_second": 10**6,
+            "api_request_burst": 10**6,
+            "api_quota_reserve": 0,
+        }
+    )
+    return config
+
+
+@contextlib.contextmanager
+def silenced():
+    """Send stdout and stderr (progress bars included) to /dev/null."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        os.dup2(devnull.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, saved_fd in zip((1, 2), saved):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+
+
+def run_stages(config, trace_memory=False):
+    """Run the repricing stages once, returning {stage: seconds or peak bytes}."""
+
+    def get_stock(_):
+        return app.get_stock_as_file_to_cache(api)
+
+    def calculate_prices(stock_list):
+        return app.calculate_new_prices_for_stock(stock_list, 0, None, api=api)[0]
+
+    def display_changes(changes):
+        app.display_price_changes_table(changes)
+        return changes
+
+    def set_stock(changes):
+        return api.set_stock(changes)
+
+    stages = dict(
+        zip(STAGES, [get_stock, calculate_prices, display_changes, set_stock])
+    )
+    results = {}
+    with silenced():
+        app = PyMkmApp(config)
+        api = app.api
+        try:
+            data = None
+            for stage in STAGES:
+                if trace_memory:
+                    tracemalloc.start()
+                    data = stages[stage](data)
+                    results[stage] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    started = time.perf_counter()
+                    data = stages[stage](data)
+                    results[stage] = time.perf_counter() - started
+        finally:
+            api.close()
+    return results
+
+
+def run_benchmark(sizes, num_products=100000, memory=True):
+    """Time (and measure peak memory of) every stage for each stock size."""
+    results = {}
+    for size in sizes:
+        runs = [("seconds", False)] + ([("peak_memory_bytes", True)] if memory else [])
+        stages = {stage: {} for stage in STAGES}
+        for key, trace_memory in runs:
+            # a fresh stand-in per run, the previous one has the new prices
+            with standin_server(size, num_products) as base_url:
+                with tempfile.TemporaryDirectory() as cache_dir:
+                    measured = run_stages(
+                        bench_config(base_url, cache_dir), trace_memory
+                    )
+            for stage, value in measured.items():
+                stages[stage][key] = round(value, 4) if key == "seconds" else value
+        results[str(size)] = stages
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "products": num_products,
+            "price_source": "price_guide",
+            "numpy": numpy.__version__ if numpy is not None else None,
+            "stock_table": PyMkmStockTable.available(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Rows comparing stage times to the baseline, and whether any regressed."""
+    rows = []
+    regressed = False
+    for size, stages in current["results"].items():
+        for stage, values in stages.items():
+            base = baseline["results"].get(size, {}).get(stage)
+            if not base:
+                rows.append([size, stage, None, values["seconds"], None, ""])
+                continue
+            ratio = values["seconds"] / base["seconds"] if base["seconds"] else None
+            slower = ratio is not None and ratio > 1 + tolerance
+            regressed = regressed or slower
+            rows.append(
+                [
+                    size,
+                    stage,
+                    base["seconds"],
+                    values["seconds"],
+                    round(ratio, 2) if ratio is not None else None,
+                    "REGRESSION" if slower else "",
+                ]
+            )
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the repricing pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip the tracemalloc runs."
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Share a stage may be slower than the baseline (default 0.25).",
+    )
+    args = parser.parse_args()
+
+    current = run_benchmark(args.sizes, args.products, memory=not args.no_memory)
+
+    print(
+        tb.tabulate(
+            [
+                [size, stage, values["seconds"], values.get("peak_memory_bytes")]
+                for size, stages in current["results"].items()
+                for stage, values in stages.items()
+            ],
+            headers=["Articles", "Stage", "Seconds", "Peak memory (bytes)"],
+            tablefmt="simple",
+        )
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        rows, regressed = compare(current, baseline, args.tolerance)
+        print()
+        print(
+            tb.tabulate(
+                rows,
+                headers=["Articles", "Stage", "Baseline", "Now", "Ratio", ""],
+                tablefmt="simple",
+            )
+        )
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
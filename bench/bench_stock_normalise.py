@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Scaling of the stock file normalisation in get_stock_as_file_to_cache.
+
+    python -m bench.bench_stock_normalise --sizes 10000 100000 500000
+
+The time per article should stay flat as the stock grows, --check exits
+non-zero if it more than triples from the smallest to the largest size. The
+memory held by the articles is measured both as Article records and as the
+plain dicts they replace.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import argparse
+import csv
+import io
+import sys
+import time
+import tracemalloc
+
+import tabulate as tb
+
+from pymkm.pymkm_app import PyMkmApp
+from pymkm.pymkm_standin_server import PyMkmStandInCatalog
+
+DEFAULT_SIZES = [10000, 100000, 500000]
+# a quadratic pass would take ~10 times longer per article for 10 times the size
+MAX_SCALING = 3
+
+
+def stock_rows(size):
+    """Parsed rows of a synthetic stock file with `size` articles."""
+    stock_file = PyMkmStandInCatalog(stock_size=size).stock_file()
+    return list(csv.DictReader(io.StringIO(stock_file), delimiter=";"))
+
+
+def retained_bytes(build):
+    """Memory still allocated by what build() returns."""
+    tracemalloc.start()
+    try:
+        kept = build()
+        return tracemalloc.get_traced_memory()[0], kept
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(sizes, memory=False):
+    results = {}
+    for size in sizes:
+        rows = stock_rows(size)
+        started = time.perf_counter()
+        articles = list(PyMkmApp.normalise_stock_rows(rows))
+        seconds = time.perf_counter() - started
+        results[size] = {
+            "articles": len(articles),
+            "seconds": round(seconds, 4),
+            "microseconds_per_article": round(seconds / size * 1e6, 3),
+        }
+        if memory:
+            del articles
+            record_bytes, _ = retained_bytes(
+                lambda: list(PyMkmApp.normalise_stock_rows(rows))
+            )
+            dict_bytes, _ = retained_bytes(
+                lambda: [a.to_dict() for a in PyMkmApp.normalise_stock_rows(rows)]
+            )
+            results[size]["bytes_per_article"] = round(record_bytes / size)
+            results[size]["dict_bytes_per_article"] = round(dict_bytes / size)
+    return results
+
+
+def scales_linearly(results):
+    """Whether the time per article stays within MAX_SCALING across sizes."""
+    per_article = [
+        results[size]["microseconds_per_article"] for size in sorted(results)
+    ]
+    return per_article[-1] < MAX_SCALING * per_article[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stock normalisation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip the tracemalloc runs."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help=f"Exit non-zero if the time per article grows over {MAX_SCALING}x.",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, memory=not args.no_memory)
+    print(
+        tb.tabulate(
+            [
+                [
+                    size,
+                    x["seconds"],
+                    x["microseconds_per_article"],
+                    x.get("bytes_per_article"),
+                    x.get("dict_bytes_per_article"),
+                ]
+                for size, x in results.items()
+            ],
+            headers=[
+                "Articles",
+                "Seconds",
+                "µs per article",
+                "Bytes per article",
+                "As dicts",
+            ],
+            tablefmt="simple",
+        )
+    )
+    if args.check and not scales_linearly(results):
+        print("Time per article does not scale linearly.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
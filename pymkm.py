@@ -50,7 +50,10 @@ def main():
     args = parser.parse_args()
 
     app = PyMkmApp()
-    app.start(args)
+    try:
+        app.start(args)
+    finally:
+        app.api.close()
 
 
 if __name__ == "__main__":
@@ -28,8 +28,14 @@ from distutils.util import strtobool
 from pkg_resources import parse_version
 
 from pymkm.pymkm_helper import PyMkmHelper, timeit
-from pymkm.pymkmapi import PyMkmApi, CardmarketError
-from pymkm.pymkm_calculators import AbstractPriceCalculator
+from pymkm.pymkmapi import (
+    PyMkmApi,
+    BatchResultDict,
+    CardmarketError,
+    QuotaExceededError,
+)
+from pymkm.pymkm_calculators import AbstractPriceCalculator, PriceBatch
+from pymkm.pymkm_models import Article, Product
 
 
 class PyMkmApp:
@@ -140,20 +146,18 @@ class PyMkmApp:
         ):  # if command line args have not been passed
             while True:
                 stock_status = ""
-                cached_stock = PyMkmHelper.read_from_cache(
+                num_cached_stock = PyMkmHelper.count_in_cache(
                     self.config["local_cache_filename"], "stock"
                 )
 
-                cached_already_checked = PyMkmHelper.read_from_cache(
+                num_already_checked = PyMkmHelper.count_in_cache(
                     self.config["local_cache_filename"], "partial_updated"
                 )
 
-                if cached_stock and not cached_already_checked:
-                    stock_status = f"({len(cached_stock)} items)"
-                if cached_stock and cached_already_checked:
-                    stock_status = (
-                        f"({len(cached_already_checked)}/{len(cached_stock)} done)"
-                    )
+                if num_cached_stock and not num_already_checked:
+                    stock_status = f"({num_cached_stock} items)"
+                if num_cached_stock and num_already_checked:
+                    stock_status = f"({num_already_checked}/{num_cached_stock} done)"
 
                 top_message = self.check_latest_version()
 
@@ -366,73 +370,57 @@ class PyMkmApp:
 
             api.add_stock(product_list)
 
-    def get_stock_as_file_to_cache(self, api, log_time_label="Fetching stock as file"):
-        # print("Fetching stock gzip file...")
-        stock = api.get_stock_file(query_params=self.config["stock_settings"])
-
-        unused_attributes = [
-            "Exp.",
-            "Exp. Name",
-            "Altered?",
-            "onSale",
-            "idCurrency",
-            "Currency Code",
-        ]
-
-        regular_stock_keys_mapping = {
-            "idArticle": "idArticle",
-            "idProduct": "idProduct",
-            "Amount": "count",
-            "Comments": "comments",
-            "Price": "price",
-            "Condition": "condition",
-            "Foil?": "isFoil",
-            "Playset?": "isPlayset",
-            "Signed?": "isSigned",
-            "Language": "idLanguage",
-        }
-        stock_list = [
-            {
-                regular_stock_keys_mapping[x]: y
-                for x, y in article.items()
-                if x in regular_stock_keys_mapping
+    # stock file column -> article key, the rest of the columns are unused
+    stock_file_columns = {
+        "idArticle": "idArticle",
+        "idProduct": "idProduct",
+        "Amount": "count",
+        "Comments": "comments",
+        "Price": "price",
+        "Condition": "condition",
+        "Foil?": "isFoil",
+        "Playset?": "isPlayset",
+        "Signed?": "isSigned",
+        "Language": "idLanguage",
+    }
+    stock_file_product_columns = {
+        "English Name": "enName",
+        "Local Name": "locName",
+        "Exp. Name": "expansion",
+    }
+
+    @classmethod
+    def normalise_stock_rows(cls, rows):
+        """Articles, with their 'product', from stock file rows in one pass."""
+        to_number = PyMkmHelper.string_to_float_or_int
+        columns = cls.stock_file_columns.items()
+        product_columns = cls.stock_file_product_columns.items()
+        for row in rows:
+            article = {
+                key: to_number(row[column]) if row[column] else row[column]
+                for column, key in columns
+                if column in row
             }
-            for article in stock
-        ]
-        # construct the 'product' entity for each article
-        for article in stock_list:
-            for k, v in article.items():
-                try:
-                    article[k] = PyMkmHelper.string_to_float_or_int(v)
-                except ValueError as err:
-                    article[k] = v
-                    continue
-
-            def map_stock_item(to_string, from_string):
-                try:
-                    return {
-                        to_string: next(
-                            x[from_string]
-                            for x in stock
-                            if int(x["idArticle"]) == article["idArticle"]
-                        )
-                    }
-                except StopIteration:
-                    return {to_string: ""}
-
-            product_item = {}
-            product_item.update(map_stock_item("enName", "English Name"))
-            product_item.update(map_stock_item("locName", "Local Name"))
-            product_item.update(map_stock_item("expansion", "Exp. Name"))
+            article["product"] = Product(
+                {key: row.get(column) or "" for column, key in product_columns}
+            )
+            yield Article(article)
 
-            article["product"] = product_item
+    def get_stock_as_file_to_cache(self, api, log_time_label="Fetching stock as file"):
+        # print("Fetching stock gzip file...")
+        # Rows are decoded one at a time, the raw stock file is never held
+        stock_list = list(
+            self.normalise_stock_rows(
+                api.iter_stock_file(query_params=self.config["stock_settings"])
+            )
+        )
 
         print("Stock fetched (using gzipped data).")
 
         PyMkmHelper.store_to_cache(
             self.config["local_cache_filename"], "stock", stock_list
         )
-        return PyMkmHelper.read_from_cache(self.config["local_cache_filename"], "stock")
+        return stock_list
 
     def clean_json_for_upload(self, not_uploadable_json):
         for entry in not_uploadable_json:
@@ -451,7 +439,7 @@ class PyMkmApp:
         )
 
         if stock_list:
-            already_checked_articles = PyMkmHelper.read_from_cache(
+            already_checked_articles = PyMkmHelper.read_ids_from_cache(
                 self.config["local_cache_filename"], "partial_updated"
             )
 
@@ -463,9 +451,9 @@ class PyMkmApp:
             # Handle articles in shopping carts
             articles_in_shopping_carts = api.get_articles_in_shoppingcarts()["article"]
             if articles_in_shopping_carts:
-                article_ids_in_shopping_carts = [
+                article_ids_in_shopping_carts = {
                     x["idArticle"] for x in articles_in_shopping_carts
-                ]
+                }
                 stock_list = [
                     x
                     for x in stock_list
@@ -511,7 +499,7 @@ class PyMkmApp:
                 )
 
                 if checked_articles:  # TODO: subtract the sticky prices
-                    PyMkmHelper.append_to_cache(
+                    PyMkmHelper.add_ids_to_cache(
                         self.config["local_cache_filename"],
                         "partial_updated",
                         checked_articles,
@@ -528,8 +516,13 @@ class PyMkmApp:
                         "Do you want to update these prices?"
                     ):
                         print("Updating prices...")
-                        api.set_stock(uploadable_json)
+                        result = api.set_stock(uploadable_json)
 
+                        num_failed = len(result.get("notUpdatedArticles", []))
+                        if num_failed:
+                            print(
+                                f"{num_failed} prices could not be updated, see the log."
+                            )
                         print("Prices updated.")
                     else:
                         print("Prices not updated.")
@@ -575,16 +568,16 @@ class PyMkmApp:
 
     def get_stock_update_result(self):
         # Check stock update progress
-        num_stock = PyMkmHelper.read_from_cache(
+        num_stock = PyMkmHelper.count_in_cache(
             self.config["local_cache_filename"], "stock"
         )
-        num_checked = PyMkmHelper.read_from_cache(
+        num_checked = PyMkmHelper.count_in_cache(
             self.config["local_cache_filename"], "partial_updated"
         )
-        if num_checked and len(num_checked) <= len(num_stock):
-            return len(num_checked), len(num_stock)
+        if num_checked and num_checked <= num_stock:
+            return num_checked, num_stock
         else:
-            return 0, len(num_stock)
+            return 0, num_stock
 
     def get_price_calculator_instance(self):
         # get calculator module and class
@@ -745,20 +738,14 @@ class PyMkmApp:
                     products_to_get = [
                         x["idProduct"] for x in sorted_articles[:num_searches]
                     ]
-                    products = api.get_items_async("products", products_to_get)
-
-                    # remove any None results (probably caused by being booster boxes etc)
-                    products = [x for x in products if x != None]
+                    products = api.get_items_async(
+                        "products", products_to_get, as_dict=True
+                    )
 
                     for article in sorted_articles[:num_searches]:
-                        try:
-                            p = next(
-                                x
-                                for x in products
-                                if x["product"]["idProduct"] == article["idProduct"]
-                            )
-                        except StopIteration:
-                            # Stock item not found in update batch, continuing
+                        p = products.get(article["idProduct"])
+                        if p is None:
+                            # Failed, probably a booster box etc, continuing
                             continue
                         name = p["product"]["enName"]
                         expansion = p["product"].get("expansion")
@@ -1034,10 +1021,9 @@ class PyMkmApp:
                     metaproducts_to_get = [
                         x["idMetaproduct"] for x in metaproducts_article_list
                     ]
-                    metaproduct_list = api.get_items_async(
-                        "metaproducts", metaproducts_to_get, bar
+                    metaproducts = api.get_items_async(
+                        "metaproducts", metaproducts_to_get, bar, as_dict=True
                     )
-                    metaproduct_list = [x for x in metaproduct_list if x]
 
                     for article in articles:
                         a_type = article.get("type")
@@ -1045,14 +1031,8 @@ class PyMkmApp:
                         product_matches = []
 
                         if a_type == "metaproduct":
-                            try:
-                                metaproduct = next(
-                                    x
-                                    for x in metaproduct_list
-                                    if x["metaproduct"]["idMetaproduct"]
-                                    == article["idMetaproduct"]
-                                )
-                            except StopIteration:
+                            metaproduct = metaproducts.get(article["idMetaproduct"])
+                            if metaproduct is None:
                                 # Stock item not found in update batch, continuing
                                 continue
 
@@ -1295,7 +1275,12 @@ class PyMkmApp:
                             "isAltered": ("true" if altered else "false"),
                             "isPlayset": ("true" if playset else "false"),
                         }
-                        api.add_stock([card])
+                        result = api.add_stock([card])
+                        inserted = result.get("inserted", [])
+                        if not inserted or not inserted[0]["success"]:
+                            error = inserted[0].get("error") if inserted else None
+                            self.logger.error(f"Failed to add {name}: {error}")
+                            return False
                         return True
                     else:
                         # no single matching card
@@ -1416,6 +1401,7 @@ class PyMkmApp:
         # articles_in_shoppingcarts = api.get_articles_in_shoppingcarts()
 
         if already_checked_articles:
+            already_checked_articles = set(already_checked_articles)
             filtered_stock_list = [
                 x
                 for x in filtered_stock_list
@@ -1428,10 +1414,31 @@ class PyMkmApp:
                 print(
                     f"Entire stock updated in partial updates. Partial update data cleared."
                 )
-                return [], []
+                return [], [], sticky_count
         if partial_stock_update_size:
             filtered_stock_list = filtered_stock_list[:partial_stock_update_size]
 
+        use_price_guide = self.config.get("price_source", "products") == "price_guide"
+
+        # Defer what does not fit in today's quota instead of running out midway
+        # (each product is fetched once, however many articles share it, and
+        # products still fresh in the response cache are not fetched at all)
+        if not use_price_guide:
+            product_ids = list(
+                dict.fromkeys(x["idProduct"] for x in filtered_stock_list)
+            )
+            cached_products = api.cache.get_many("products", product_ids)
+            uncached_ids = [x for x in product_ids if x not in cached_products]
+            try:
+                api.reserve_quota(len(uncached_ids), "Price update")
+            except QuotaExceededError as err:
+                print(f"{err.mkm_msg()} Deferring the rest to a later partial update.")
+                allowed_products = set(cached_products)
+                allowed_products.update(uncached_ids[: err.allowed])
+                filtered_stock_list = [
+                    x for x in filtered_stock_list if x["idProduct"] in allowed_products
+                ]
+
         result_json = []
         checked_articles = []
         total_price = 0
@@ -1441,38 +1448,57 @@ class PyMkmApp:
         # bar.update(index)
 
         products_to_get = [x["idProduct"] for x in filtered_stock_list]
-        product_list = api.get_items_async(
-            "products", products_to_get, bar
-        )  # TODO: pass bar in here?
-        product_list = [x for x in product_list if x]
+        if use_price_guide:
+            product_list = self.get_products_from_price_guide(api, products_to_get)
+        else:
+            product_list = api.get_items_async(
+                "products", products_to_get, bar, as_dict=True
+            )
+        failed_products = product_list.failures
 
+        priced_articles = []
         for article in filtered_stock_list:
-            try:
-                product = next(
-                    x
-                    for x in product_list
-                    if x["product"]["idProduct"] == article["idProduct"]
-                )
-            except StopIteration:
+            product = product_list.get(article["idProduct"])
+            if product is None:
                 # Stock item not found in update batch, continuing
+                reason = failed_products.get(article["idProduct"], "empty response")
                 self.logger.error(
-                    f"aid {article['idArticle']} pid {article['idProduct']} - Empty or timed out response for {article['product']['enName']} ({article['product']['expansion']})"
+                    f"aid {article['idArticle']} pid {article['idProduct']} - {reason} for {article['product']['enName']} ({article['product']['expansion']})"
                 )
                 continue
-
-            checked_articles.append(article.get("idArticle"))
-            updated_article = self.update_price_for_article(
-                article, product, api=self.api
-            )
-            if updated_article:
-                result_json.append(updated_article)
-                total_price += updated_article.get("price") * updated_article.get(
-                    "count"
+            checked_articles.append(article["idArticle"])
+            priced_articles.append(article)
+
+        batch = PriceBatch(
+            priced_articles,
+            product_list,
+            self.get_discount_for_condition,
+            self.get_rounding_limit_for_rarity,
+        )
+        new_prices = self.price_calculator.calculate_prices(batch)
+        if batch.table is not None:
+            # The calculator priced a stock table, diff it all at once too
+            changed, price_diffs = batch.table.price_changes(new_prices)
+            for index, price_diff in zip(changed.tolist(), price_diffs.tolist()):
+                uploadable_json = self.article_to_uploadable_json(
+                    priced_articles[index], new_prices[index]
                 )
-            else:
-                total_price += article.get("price") * article.get("count")
-            # index += 1
-            bar.update()
+                uploadable_json["price_diff"] = price_diff
+                result_json.append(uploadable_json)
+            total_price = batch.table.stock_value(new_prices)
+            bar.update(bar.max_value)
+        else:
+            for article, new_price in zip(priced_articles, new_prices):
+                updated_article = self.price_change_for_article(article, new_price)
+                if updated_article:
+                    result_json.append(updated_article)
+                    total_price += updated_article.get("price") * updated_article.get(
+                        "count"
+                    )
+                else:
+                    total_price += article.get("price") * article.get("count")
+                # index += 1
+                bar.update()
         bar.finish()
 
         print("Value in this update: {}".format(str(round(total_price, 2))))
@@ -1480,18 +1506,33 @@ class PyMkmApp:
             print(f"Note: {sticky_count} items filtered out because of sticky prices.")
         return result_json, checked_articles, sticky_count
 
+    def get_products_from_price_guide(self, api, product_ids):
+        """Look up products in the bulk price guide instead of one call each."""
+        price_guide = api.get_price_guide(self.config["stock_settings"]["idGame"])
+        product_list = BatchResultDict()
+        for product_id in product_ids:
+            product = price_guide.get(product_id)
+            if product:
+                product_list[product_id] = product
+            else:
+                product_list.failures[product_id] = "not in price guide"
+        return product_list
+
     def update_price_for_article(self, article, product, api=None):
         language_id = PyMkmHelper.string_to_float_or_int(article["idLanguage"])
 
         new_price = self.get_price_for_product(
             product,
-            product["product"].get("rarity"),
+            PriceBatch.rarity(product),
             article.get("condition"),
             article.get("isFoil", False),
             article.get("isPlayset", False),
             language_id=language_id,
             api=self.api,
         )
+        return self.price_change_for_article(article, new_price)
+
+    def price_change_for_article(self, article, new_price):
         if new_price:
             price_diff = new_price - article["price"]
             if price_diff != 0:
@@ -1516,6 +1557,8 @@ class PyMkmApp:
 
     def get_rounding_limit_for_rarity(self, rarity, product_id):
         rounding_limit = float(self.config["price_limit_by_rarity"]["default"])
+        if rarity is None:
+            return rounding_limit
 
         try:
             rounding_limit = float(self.config["price_limit_by_rarity"][rarity.lower()])
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Disk-backed cache for Cardmarket API responses that rarely change.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class PyMkmResponseCache:
+    """SQLite backed response cache with a TTL per resource type and LRU eviction.
+
+    Only the resource types in `ttl` are cached. Hits are served without
+    calling the API, so they don't spend any quota.
+    """
+
+    DEFAULT_TTL = {
+        "products": 6 * 3600,  # price guides are updated during the day
+        "metaproducts": 24 * 3600,
+        "expansions": 7 * 24 * 3600,
+        "games": 7 * 24 * 3600,
+    }
+
+    def __init__(
+        self, filename, ttl=None, max_entries=50000, enabled=True, clock=time.time
+    ):
+        self.filename = filename
+        self.ttl = dict(self.DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = None
+        self.num_entries = 0
+
+    def handles(self, resource):
+        return self.enabled and resource in self.ttl
+
+    def __connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+            # It's a cache, losing the last writes on a crash is fine
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=OFF")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "resource TEXT, item_id TEXT, data TEXT, stored REAL, accessed REAL, "
+                "PRIMARY KEY (resource, item_id))"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self.num_entries = self.connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+        return self.connection
+
+    def get(self, resource, item_id):
+        return self.get_many(resource, [item_id]).get(item_id)
+
+    def get_many(self, resource, item_ids):
+        """Return {item_id: response} for the fresh entries among item_ids."""
+        if not self.handles(resource):
+            return {}
+        keys = {str(item_id): item_id for item_id in item_ids}
+        now = self.clock()
+        found = {}
+        with self.lock:
+            connection = self.__connect()
+            key_list = list(keys)
+            for i in range(0, len(key_list), 500):
+                batch = key_list[i : i + 500]
+                rows = connection.execute(
+                    f"SELECT item_id, data FROM responses WHERE resource = ? "
+                    f"AND stored >= ? AND item_id IN ({','.join('?' * len(batch))})",
+                    [resource, now - self.ttl[resource], *batch],
+                ).fetchall()
+                for key, data in rows:
+                    found[keys[key]] = json.loads(data)
+            if found:
+                connection.executemany(
+                    "UPDATE responses SET accessed = ? WHERE resource = ? AND item_id = ?",
+                    [(now, resource, str(item_id)) for item_id in found],
+                )
+                connection.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, resource, item_id, data):
+        self.put_many(resource, {item_id: data})
+
+    def put_many(self, resource, items):
+        if not self.handles(resource) or not items:
+            return
+        now = self.clock()
+        with self.lock:
+            connection = self.__connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                [
+                    (resource, str(item_id), json.dumps(data), now, now)
+                    for item_id, data in items.items()
+                ],
+            )
+            self.num_entries = connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+            if self.num_entries > self.max_entries:
+                self.__evict(connection)
+            connection.commit()
+
+    def __evict(self, connection):
+        # Evict down to 90% so eviction doesn't run on every insert
+        excess = self.num_entries - int(self.max_entries * 0.9)
+        connection.execute(
+            "DELETE FROM responses WHERE rowid IN "
+            "(SELECT rowid FROM responses ORDER BY accessed LIMIT ?)",
+            (excess,),
+        )
+        self.num_entries -= excess
+
+    def clear(self, resource=None):
+        with self.lock:
+            connection = self.__connect()
+            if resource:
+                connection.execute(
+                    "DELETE FROM responses WHERE resource = ?", (resource,)
+                )
+            else:
+                connection.execute("DELETE FROM responses")
+            connection.commit()
+            self.num_entries = connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": self.num_entries,
+        }
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -1,5 +1,62 @@
 import abc
 from pymkm.pymkm_helper import PyMkmHelper
+from pymkm.pymkm_stock_table import PyMkmStockTable
+
+
+class PriceBatch:
+    """Articles priced together, with their products (in get_product's shape).
+
+    `discount_for_condition(condition)` and
+    `rounding_limit_for_rarity(rarity, product_id)` return the configured
+    condition discounts and rounding limits. `table` is the batch's
+    PyMkmStockTable once stock_table() has built it.
+    """
+
+    def __init__(
+        self, articles, products, discount_for_condition, rounding_limit_for_rarity
+    ):
+        self.articles = articles
+        self.products = products
+        self.discount_for_condition = discount_for_condition
+        self.rounding_limit_for_rarity = rounding_limit_for_rarity
+        self.table = None
+
+    def __len__(self):
+        return len(self.articles)
+
+    def __iter__(self):
+        """(article, product) pairs."""
+        for article in self.articles:
+            yield article, self.products[article["idProduct"]]
+
+    def stock_table(self):
+        """The batch as a PyMkmStockTable (needs NumPy), built once."""
+        if self.table is None:
+            self.table = PyMkmStockTable(self.articles, self.products)
+        return self.table
+
+    @staticmethod
+    def rarity(product):
+        """The product's rarity, None (the default rounding limit) if unknown.
+
+        Products from the price guide files never have one.
+        """
+        return product["product"].get("rarity")
+
+    def calculate_price_arguments(self, article, product):
+        """The arguments calculate_price takes for an article."""
+        rounding_limit = self.rounding_limit_for_rarity(
+            self.rarity(product), product["product"]["idProduct"]
+        )
+        condition = article.get("condition")
+        return (
+            article.get("isFoil", False),
+            article.get("isPlayset", False),
+            condition,
+            self.discount_for_condition(condition),
+            rounding_limit,
+            product,
+        )
 
 
 class AbstractPriceCalculator(abc.ABC):
@@ -7,6 +64,19 @@ class AbstractPriceCalculator(abc.ABC):
     def calculate_price(cls, card_info: dict) -> float:
         raise NotImplementedError
 
+    @classmethod
+    def calculate_prices(cls, batch: PriceBatch) -> list:
+        """New prices for all articles in the batch, in order.
+
+        Override to price the batch as a whole, e.g. with statistics across
+        it or vectorised maths. By default each article is priced with
+        calculate_price.
+        """
+        return [
+            cls.calculate_price(*batch.calculate_price_arguments(article, product))
+            for article, product in batch
+        ]
+
 
 class DefaultPriceCalculator(AbstractPriceCalculator):
     @classmethod
@@ -43,3 +113,21 @@ class DefaultPriceCalculator(AbstractPriceCalculator):
             )
 
             return round(new_price, 2)
+
+    @classmethod
+    def calculate_prices(cls, batch: PriceBatch) -> list:
+        # The same prices for the whole batch at once, if NumPy is installed
+        # (and calculate_price is not overridden)
+        if (
+            PyMkmStockTable.available()
+            and cls.calculate_price.__func__
+            is DefaultPriceCalculator.calculate_price.__func__
+        ):
+            return (
+                batch.stock_table()
+                .calculate_prices(
+                    batch.discount_for_condition, batch.rounding_limit_for_rarity
+                )
+                .tolist()
+            )
+        return super().calculate_prices(batch)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Record and replay Cardmarket API traffic, for reproducing a real shop's
+workload in profiling and benchmark runs without quota or network.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import asyncio
+import base64
+import collections
+import gzip
+import hashlib
+import json
+import threading
+import time
+import urllib.parse
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class CassetteMissError(LookupError):
+    pass
+
+
+class PyMkmCassette:
+    """Request/response pairs with their latency, in a gzipped JSON lines file.
+
+    Requests are matched on method, path, query and a hash of the body, so
+    OAuth signatures and the host do not matter. Repeated requests replay
+    their responses in recorded order, the last one again once they run
+    out. `speed` 1 replays at recorded latency, 2 twice as fast and 0 as
+    fast as possible.
+    """
+
+    VERSION = 1
+    # the stored content is already decoded
+    SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+    def __init__(self, filename, mode="replay", speed=0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}'.")
+        self.filename = filename
+        self.mode = mode
+        self.speed = speed
+        self.interactions = []
+        self.replay_queues = {}
+        self.last_replayed = {}
+        self.misses = 0
+        self.lock = threading.Lock()
+        if mode == "replay":
+            self.load()
+
+    @classmethod
+    def from_config(cls, config):
+        """The cassette configured with api_cassette_*, None if there is none."""
+        filename = config.get("api_cassette_filename")
+        if not filename:
+            return None
+        return cls(
+            filename,
+            mode=config.get("api_cassette_mode", "replay"),
+            speed=config.get("api_cassette_replay_speed", 0),
+        )
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @staticmethod
+    def key(method, url, body=None):
+        parts = urllib.parse.urlsplit(str(url))
+        query = urllib.parse.urlencode(
+            sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+        )
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest() if body else ""
+        return f"{method.upper()} {parts.path}?{query} {digest}"
+
+    def response_headers(self, headers):
+        return {
+            k: v for k, v in headers.items() if k.lower() not in self.SKIPPED_HEADERS
+        }
+
+    def record(self, method, url, body, status, headers, content, elapsed):
+        try:
+            text, encoded = content.decode("utf-8"), False
+        except UnicodeDecodeError:
+            text, encoded = base64.b64encode(content).decode("ascii"), True
+        interaction = {
+            "key": self.key(method, url, body),
+            "status": status,
+            "headers": self.response_headers(headers),
+            "content": text,
+            "base64": encoded,
+            "elapsed": round(elapsed, 6),
+        }
+        with self.lock:
+            self.interactions.append(interaction)
+
+    def replay(self, method, url, body=None):
+        """The next recorded response to a request, raises CassetteMissError."""
+        key = self.key(method, url, body)
+        with self.lock:
+            queue = self.replay_queues.get(key)
+            if queue:
+                self.last_replayed[key] = queue.popleft()
+            elif key not in self.last_replayed:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for {key}.")
+            return self.last_replayed[key]
+
+    @staticmethod
+    def content(interaction):
+        if interaction["base64"]:
+            return base64.b64decode(interaction["content"])
+        return interaction["content"].encode("utf-8")
+
+    def delay(self, interaction):
+        """Seconds to wait before replaying a response at the cassette's speed."""
+        if not self.speed:
+            return 0.0
+        return interaction["elapsed"] / self.speed
+
+    def load(self):
+        with gzip.open(self.filename, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("pymkm_cassette") != self.VERSION:
+                raise ValueError(
+                    f"{self.filename} is not a version {self.VERSION} cassette."
+                )
+            self.interactions = [json.loads(line) for line in f]
+        self.replay_queues = collections.defaultdict(collections.deque)
+        for interaction in self.interactions:
+            self.replay_queues[interaction["key"]].append(interaction)
+
+    def save(self):
+        with self.lock:
+            interactions = list(self.interactions)
+        with gzip.open(self.filename, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"pymkm_cassette": self.VERSION}) + "\n")
+            for interaction in interactions:
+                f.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+
+
+class CassetteAdapter(BaseAdapter):
+    """requests transport adapter recording through `adapter`, or replaying."""
+
+    def __init__(self, cassette, adapter=None):
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        if self.cassette.recording:
+            started = time.perf_counter()
+            response = self.adapter.send(request, **kwargs)
+            self.cassette.record(
+                request.method,
+                request.url,
+                request.body,
+                response.status_code,
+                response.headers,
+                response.content,
+                time.perf_counter() - started,
+            )
+            return response
+
+        try:
+            interaction = self.cassette.replay(
+                request.method, request.url, request.body
+            )
+        except CassetteMissError as err:
+            raise requests.exceptions.ConnectionError(str(err), request=request)
+        delay = self.cassette.delay(interaction)
+        if delay:
+            time.sleep(delay)
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response._content = self.cassette.content(interaction)
+        # read, so iter_content serves it when the request was streamed
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        if self.adapter is not None:
+            self.adapter.close()
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording through `transport`, or replaying."""
+
+    def __init__(self, cassette, transport=None):
+        self.cassette = cassette
+        if transport is None and cassette.recording:
+            transport = httpx.AsyncHTTPTransport()
+        self.transport = transport
+
+    async def handle_async_request(self, request):
+        if self.cassette.recording:
+            started = time.perf_counter()
+            response = await self.transport.handle_async_request(request)
+            try:
+                content = await response.aread()
+            finally:
+                await response.aclose()
+            self.cassette.record(
+                request.method,
+                request.url,
+                request.content,
+                response.status_code,
+                response.headers,
+                content,
+                time.perf_counter() - started,
+            )
+            return httpx.Response(
+                response.status_code,
+                headers=self.cassette.response_headers(response.headers),
+                content=content,
+                request=request,
+            )
+
+        try:
+            interaction = self.cassette.replay(
+                request.method, request.url, request.content
+            )
+        except CassetteMissError as err:
+            raise httpx.ConnectError(str(err), request=request)
+        delay = self.cassette.delay(interaction)
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(
+            interaction["status"],
+            headers=interaction["headers"],
+            content=self.cassette.content(interaction),
+            request=request,
+        )
+
+    async def aclose(self):
+        if self.transport is not None:
+            await self.transport.aclose()
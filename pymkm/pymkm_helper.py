@@ -9,12 +9,13 @@ __license__ = "MIT"
 
 import math
 import statistics
-import shelve
 import collections.abc
 import time
 from xml.etree.ElementTree import Element, ElementTree, tostring
 from distutils.util import strtobool
 
+from pymkm.pymkm_local_store import PyMkmLocalStore
+
 
 def timeit(method):
     def timed(*args, **kw):
@@ -32,12 +33,10 @@ class PyMkmHelper:
     @staticmethod
     def string_to_float_or_int(input_string):
         try:
-            if float(input_string).is_integer():
-                return int(float(input_string))
-            else:
-                return float(input_string)
+            number = float(input_string)
         except ValueError:
             return input_string
+        return int(number) if number.is_integer() else number
 
     @staticmethod
     def calculate_average(table, col_no_count, col_no_price):
@@ -104,51 +103,43 @@ class PyMkmHelper:
 
     @staticmethod
     def store_to_cache(filename, label, data):
-        s = shelve.open(filename)
         if len(data) > 0:
-            try:
-                s[label] = data
-                print(f"[Cache] {label.title()} cached ({len(data)} items).")
-                return len(s[label])
-            finally:
-                s.close()
+            count = PyMkmLocalStore.open(filename).store(label, data)
+            print(f"[Cache] {label.title()} cached ({count} items).")
+            return count
 
     @staticmethod
     def append_to_cache(filename, label, data):
-        s = shelve.open(filename)
         if len(data) > 0:
-            try:
-                appended_data = s[label]
-                appended_data.extend(data)
-                s[label] = appended_data
-                print(f"[Cache] {label.title()} cached ({len(data)} new items).")
-                return len(s[label])
-            except KeyError:
-                s.close()
-                return PyMkmHelper.store_to_cache(filename, label, data)
-            finally:
-                s.close()
+            count = PyMkmLocalStore.open(filename).append(label, data)
+            print(f"[Cache] {label.title()} cached ({len(data)} new items).")
+            return count
+
+    @staticmethod
+    def add_ids_to_cache(filename, label, ids):
+        """Add integer ids to a duplicate free set of ids in the cache."""
+        count = PyMkmLocalStore.open(filename).add_ids(label, ids)
+        print(f"[Cache] {label.title()} cached ({count} items).")
+        return count
+
+    @staticmethod
+    def read_ids_from_cache(filename, label):
+        """The ids stored with add_ids_to_cache as a set, empty if none."""
+        return set(PyMkmHelper.read_from_cache(filename, label) or ())
+
+    @staticmethod
+    def count_in_cache(filename, label):
+        """Number of items cached under label, without reading them."""
+        return PyMkmLocalStore.open(filename).count(label)
 
     @staticmethod
     def clear_cache(filename, label):
-        s = shelve.open(filename)
-        try:
-            del s[label]
+        if PyMkmLocalStore.open(filename).clear(label):
             print(f"[Cache] {label.title()} cleared.")
-        except KeyError:
-            pass
-        finally:
-            s.close()
 
     @staticmethod
     def read_from_cache(filename, label):
-        s = shelve.open(filename)
-        try:
-            return s[label]
-        except KeyError as ke:
-            return None
-        finally:
-            s.close()
+        return PyMkmLocalStore.open(filename).read(label)
 
     @staticmethod
     def update_recursive(d, u):
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+SQLite backed local store for the app's cached stock, wantslists and progress.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import array
+import collections.abc
+import os
+import pickle
+import sqlite3
+import threading
+
+
+class PyMkmLocalStore:
+    """One row per stored item, indexed by label and item id.
+
+    A label holds a list (stock, wantslists), a dict (wantslist items per
+    wantslist) or a set of integer ids (checked articles). Items are pickled
+    one by one, so appends only write the new rows and counts never load
+    any data. Every write is a single transaction and the database runs in
+    WAL mode, so other processes can read while the app writes.
+    """
+
+    # the first of these keys found in an item is stored as its id
+    ITEM_ID_KEYS = ("idArticle", "idWant", "idWantsList", "idProduct")
+
+    stores = {}
+    stores_lock = threading.Lock()
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.connection = None
+
+    @classmethod
+    def open(cls, cache_filename):
+        """The shared store for a `local_cache_filename`.
+
+        The database lives next to it with a .sqlite extension, so it never
+        collides with a shelve file from earlier versions.
+        """
+        filename = os.path.splitext(cache_filename)[0] + ".sqlite"
+        with cls.stores_lock:
+            store = cls.stores.get(filename)
+            if store is not None and store.connection and not os.path.exists(filename):
+                # deleted while open, don't keep writing to the unlinked file
+                store.close()
+                store = None
+            if store is None:
+                store = cls.stores[filename] = cls(filename)
+        return store
+
+    def __connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS labels (label TEXT PRIMARY KEY, kind TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "label TEXT, position INTEGER, item_id INTEGER, data BLOB, "
+                "PRIMARY KEY (label, position))"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS items_item_id ON items (label, item_id)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS ids ("
+                "label TEXT, item_id INTEGER, PRIMARY KEY (label, item_id)) "
+                "WITHOUT ROWID"
+            )
+            self.connection.commit()
+        return self.connection
+
+    @classmethod
+    def item_id(cls, item):
+        if isinstance(item, int):
+            return item
+        if isinstance(item, collections.abc.Mapping):
+            for key in cls.ITEM_ID_KEYS:
+                if key in item:
+                    return item[key]
+        return None
+
+    @classmethod
+    def __rows(cls, label, data, start=0):
+        if isinstance(data, dict):
+            for position, (key, value) in enumerate(data.items(), start):
+                yield (
+                    label,
+                    position,
+                    key if isinstance(key, int) else None,
+                    pickle.dumps((key, value), pickle.HIGHEST_PROTOCOL),
+                )
+        else:
+            for position, item in enumerate(data, start):
+                yield (
+                    label,
+                    position,
+                    cls.item_id(item),
+                    pickle.dumps(item, pickle.HIGHEST_PROTOCOL),
+                )
+
+    @staticmethod
+    def __kind(connection, label):
+        row = connection.execute(
+            "SELECT kind FROM labels WHERE label = ?", [label]
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def __delete(connection, label):
+        connection.execute("DELETE FROM items WHERE label = ?", [label])
+        connection.execute("DELETE FROM ids WHERE label = ?", [label])
+        connection.execute("DELETE FROM labels WHERE label = ?", [label])
+
+    @staticmethod
+    def __count(connection, label, kind):
+        table = "ids" if kind == "ids" else "items"
+        return connection.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE label = ?", [label]
+        ).fetchone()[0]
+
+    def store(self, label, data):
+        """Replace what is stored under label with data, returns the item count."""
+        kind = "dict" if isinstance(data, dict) else "list"
+        with self.lock:
+            connection = self.__connect()
+            with connection:
+                self.__delete(connection, label)
+                connection.execute("INSERT INTO labels VALUES (?, ?)", [label, kind])
+                connection.executemany(
+                    "INSERT INTO items VALUES (?, ?, ?, ?)", self.__rows(label, data)
+                )
+            return self.__count(connection, label, kind)
+
+    def append(self, label, data):
+        """Append the items in data to a stored list, returns the item count."""
+        with self.lock:
+            connection = self.__connect()
+            with connection:
+                kind = self.__kind(connection, label)
+                if kind is None:
+                    connection.execute(
+                        "INSERT INTO labels VALUES (?, ?)", [label, "list"]
+                    )
+                elif kind != "list":
+                    raise TypeError(f"Can't append to '{label}', it is not a list.")
+                start = connection.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM items WHERE label = ?",
+                    [label],
+                ).fetchone()[0]
+                connection.executemany(
+                    "INSERT INTO items VALUES (?, ?, ?, ?)",
+                    self.__rows(label, data, start),
+                )
+            return self.__count(connection, label, "list")
+
+    def add_ids(self, label, ids):
+        """Add integer ids to the set stored under label, returns its size."""
+        with self.lock:
+            connection = self.__connect()
+            with connection:
+                kind = self.__kind(connection, label)
+                if kind != "ids":
+                    self.__delete(connection, label)
+                    connection.execute(
+                        "INSERT INTO labels VALUES (?, ?)", [label, "ids"]
+                    )
+                connection.executemany(
+                    "INSERT OR IGNORE INTO ids VALUES (?, ?)",
+                    ((label, int(item_id)) for item_id in ids),
+                )
+            return self.__count(connection, label, "ids")
+
+    def read(self, label):
+        """The list, dict or sorted array("q") of ids stored under label, or None."""
+        with self.lock:
+            connection = self.__connect()
+            kind = self.__kind(connection, label)
+            if kind is None:
+                return None
+            if kind == "ids":
+                return array.array(
+                    "q",
+                    (
+                        item_id
+                        for (item_id,) in connection.execute(
+                            "SELECT item_id FROM ids WHERE label = ? ORDER BY item_id",
+                            [label],
+                        )
+                    ),
+                )
+            rows = connection.execute(
+                "SELECT data FROM items WHERE label = ? ORDER BY position", [label]
+            )
+            if kind == "dict":
+                return dict(pickle.loads(data) for (data,) in rows)
+            return [pickle.loads(data) for (data,) in rows]
+
+    def get(self, label, item_id):
+        """The first item stored under label with this id, or None."""
+        with self.lock:
+            connection = self.__connect()
+            row = connection.execute(
+                "SELECT data FROM items WHERE label = ? AND item_id = ? "
+                "ORDER BY position LIMIT 1",
+                [label, item_id],
+            ).fetchone()
+            if row is None:
+                return None
+            item = pickle.loads(row[0])
+            return item[1] if self.__kind(connection, label) == "dict" else item
+
+    def count(self, label):
+        """Number of items stored under label (0 if none), without loading them."""
+        with self.lock:
+            connection = self.__connect()
+            kind = self.__kind(connection, label)
+            if kind is None:
+                return 0
+            return self.__count(connection, label, kind)
+
+    def clear(self, label):
+        """Delete label, returns whether there was anything stored under it."""
+        with self.lock:
+            connection = self.__connect()
+            with connection:
+                existed = self.__kind(connection, label) is not None
+                self.__delete(connection, label)
+            return existed
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Per-endpoint request metrics for the Cardmarket API.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import collections
+import json
+import threading
+import urllib.parse
+
+
+class EndpointMetrics:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.requests = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.status_codes = collections.Counter()
+
+    def observe(self, status, latency, bytes_sent, bytes_received):
+        self.requests += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+        self.status_codes[str(status)] += 1
+        for i, bound in enumerate(self.buckets):
+            if latency <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def to_dict(self):
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            cumulative += count
+            histogram[str(bound)] = cumulative
+        histogram["+Inf"] = self.requests
+        return {
+            "requests": self.requests,
+            "latency_seconds": {
+                "sum": round(self.latency_sum, 6),
+                "mean": (
+                    round(self.latency_sum / self.requests, 6) if self.requests else 0.0
+                ),
+                "max": round(self.latency_max, 6),
+                "histogram": histogram,
+            },
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+            "status_codes": dict(self.status_codes),
+        }
+
+
+class PyMkmMetrics:
+    """Latency histograms, bytes, status codes and retries per endpoint family.
+
+    The family is the first path segment after the API's base URL, so
+    /products/123 and /products/find both count as "products". Every
+    request sent is one call of the daily quota, the last quota read from
+    the response headers is kept as well.
+    """
+
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    FAMILY_ALIASES = {"wantslist": "wantslists", "users": "articles"}
+
+    def __init__(self, base_url="", buckets=LATENCY_BUCKETS):
+        self.base_path = urllib.parse.urlsplit(base_url).path.rstrip("/")
+        self.buckets = tuple(buckets)
+        self.endpoints = {}
+        self.quota = {"count": None, "max": None}
+        self.lock = threading.Lock()
+
+    def family(self, url):
+        path = urllib.parse.urlsplit(str(url)).path
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path) :]
+        segment = path.strip("/").split("/")[0] or "root"
+        return self.FAMILY_ALIASES.get(segment, segment)
+
+    def __endpoint(self, family):
+        if family not in self.endpoints:
+            self.endpoints[family] = EndpointMetrics(self.buckets)
+        return self.endpoints[family]
+
+    def record(self, url, status, latency, bytes_sent=0, bytes_received=0):
+        with self.lock:
+            self.__endpoint(self.family(url)).observe(
+                status, latency, bytes_sent, bytes_received
+            )
+
+    def record_retry(self, url, count=1):
+        with self.lock:
+            self.__endpoint(self.family(url)).retries += count
+
+    def record_quota(self, requests_count, requests_max):
+        with self.lock:
+            self.quota = {"count": requests_count, "max": requests_max}
+
+    def to_dict(self):
+        with self.lock:
+            endpoints = {
+                family: metrics.to_dict()
+                for family, metrics in sorted(self.endpoints.items())
+            }
+            quota = dict(self.quota)
+        quota["consumed_this_run"] = sum(x["requests"] for x in endpoints.values())
+        return {"endpoints": endpoints, "quota": quota}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        data = self.to_dict()
+        lines = []
+
+        def sample(name, labels, value):
+            label_string = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            if label_string:
+                name = f"{name}{{{label_string}}}"
+            lines.append(f"pymkm_{name} {value}")
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP pymkm_{name} {help_text}")
+            lines.append(f"# TYPE pymkm_{name} {metric_type}")
+            for labels, value in samples:
+                sample(name, labels, value)
+
+        endpoints = data["endpoints"].items()
+        metric(
+            "request_duration_seconds",
+            "histogram",
+            "Request latency per endpoint family.",
+            [],
+        )
+        for family, x in endpoints:
+            for bound, count in x["latency_seconds"]["histogram"].items():
+                sample(
+                    "request_duration_seconds_bucket",
+                    {"endpoint": family, "le": bound},
+                    count,
+                )
+            sample(
+                "request_duration_seconds_sum",
+                {"endpoint": family},
+                x["latency_seconds"]["sum"],
+            )
+            sample(
+                "request_duration_seconds_count", {"endpoint": family}, x["requests"]
+            )
+        metric(
+            "responses_total",
+            "counter",
+            "Responses per endpoint family and status code.",
+            [
+                ({"endpoint": family, "code": code}, count)
+                for family, x in endpoints
+                for code, count in sorted(x["status_codes"].items())
+            ],
+        )
+        for name, key, help_text in (
+            ("bytes_sent_total", "bytes_sent", "Request body bytes sent."),
+            ("bytes_received_total", "bytes_received", "Response body bytes received."),
+            ("retries_total", "retries", "Retried requests."),
+        ):
+            metric(
+                name,
+                "counter",
+                help_text,
+                [({"endpoint": family}, x[key]) for family, x in endpoints],
+            )
+        quota = data["quota"]
+        if quota["max"] is not None:
+            metric(
+                "quota_used", "gauge", "Daily API calls used.", [({}, quota["count"])]
+            )
+            metric("quota_max", "gauge", "Daily API call limit.", [({}, quota["max"])])
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename):
+        """Write the metrics as a Prometheus textfile (.prom) or JSON."""
+        with open(filename, "w", encoding="utf-8") as f:
+            if filename.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                f.write(self.to_json())
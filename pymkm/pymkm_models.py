@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compact stock article and product records for large stocks.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import collections.abc
+import sys
+
+
+class SlotRecord(collections.abc.MutableMapping):
+    """A record with a fixed set of fields in __slots__, used like a dict.
+
+    Fields are read and written as record["field"] (or record.field) and
+    unset fields are missing keys, so code written for the dicts the API
+    returns works unchanged. Fields in `interned` hold few distinct
+    strings (conditions, rarities, expansions), they are interned so all
+    records share one copy of each. to_dict() returns plain dicts for
+    code that needs them, e.g. to serialise the record.
+    """
+
+    __slots__ = ()
+    fields = frozenset()
+    interned = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.fields = frozenset(cls.__slots__)
+
+    def __init__(self, values=(), **kwargs):
+        if kwargs or not isinstance(values, dict):
+            values = dict(values, **kwargs)
+        if not self.fields.issuperset(values):
+            unknown = ", ".join(sorted(set(values) - self.fields))
+            raise TypeError(f"{type(self).__name__} has no field(s) {unknown}.")
+        for key, value in values.items():
+            setattr(self, key, value)
+        for key in self.interned:
+            value = getattr(self, key, None)
+            if isinstance(value, str):
+                setattr(self, key, sys.intern(value))
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fields:
+            raise KeyError(key)
+        if key in self.interned and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.fields:
+            return getattr(self, key, default)
+        return default
+
+    def __contains__(self, key):
+        return key in self.fields and hasattr(self, key)
+
+    def __iter__(self):
+        return (key for key in self.__slots__ if hasattr(self, key))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        # rebuilt through __init__, so unpickled records are interned too
+        return type(self), (dict(self),)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def to_dict(self):
+        return {
+            key: value.to_dict() if isinstance(value, SlotRecord) else value
+            for key, value in self.items()
+        }
+
+
+class Product(SlotRecord):
+    """The product of a stock article, as named in the stock file."""
+
+    __slots__ = ("enName", "locName", "expansion", "rarity")
+    interned = frozenset({"expansion", "rarity"})
+
+
+class Article(SlotRecord):
+    """A stock article, with its `product`."""
+
+    __slots__ = (
+        "idArticle",
+        "idProduct",
+        "count",
+        "comments",
+        "price",
+        "condition",
+        "isFoil",
+        "isPlayset",
+        "isSigned",
+        "idLanguage",
+        "product",
+    )
+    interned = frozenset({"condition"})
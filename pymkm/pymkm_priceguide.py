@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Local index of Cardmarket's bulk price guide and product list files.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import csv
+import gzip
+import io
+
+
+class PyMkmPriceGuide:
+    """Price guide for a whole game indexed by idProduct.
+
+    Built from the CSV files behind the /priceguide and /productlist
+    endpoints, lookups return the same shape as get_product so the price
+    calculators work on either.
+    """
+
+    # CSV column -> key in the API's priceGuide
+    PRICE_GUIDE_COLUMNS = {
+        "Avg. Sell Price": "SELL",
+        "Low Price": "LOW",
+        "Trend Price": "TREND",
+        "German Pro Low": "GERMANPROLOW",
+        "Suggested Price": "SUGGESTED",
+        "Foil Sell": "SELLFOIL",
+        "Foil Low": "LOWFOIL",
+        "Foil Trend": "TRENDFOIL",
+        "Low Price Ex+": "LOWEX",
+        "AVG1": "AVG1",
+        "AVG7": "AVG7",
+        "AVG30": "AVG30",
+        "Foil AVG1": "AVG1FOIL",
+        "Foil AVG7": "AVG7FOIL",
+        "Foil AVG30": "AVG30FOIL",
+    }
+
+    # CSV column -> key in the API's product
+    PRODUCT_LIST_COLUMNS = {
+        "Name": "enName",
+        "Category ID": "idCategory",
+        "Category": "categoryName",
+        "Expansion ID": "idExpansion",
+        "Metacard ID": "idMetaproduct",
+    }
+
+    def __init__(self, price_guide_rows, product_list_rows=None):
+        self.prices = {}
+        for row in price_guide_rows:
+            self.prices[int(row["idProduct"])] = {
+                key: self.__to_price(row.get(column))
+                for column, key in self.PRICE_GUIDE_COLUMNS.items()
+                if column in row
+            }
+
+        self.products = {}
+        for row in product_list_rows or []:
+            product_id = int(row["idProduct"])
+            if product_id in self.prices:
+                self.products[product_id] = {
+                    key: row[column]
+                    for column, key in self.PRODUCT_LIST_COLUMNS.items()
+                    if column in row
+                }
+
+    @staticmethod
+    def __to_price(value):
+        if value is None or value.strip() == "":
+            return None
+        return float(value)
+
+    @staticmethod
+    def read_csv(data):
+        """Parse CSV text (or gzipped CSV bytes) into a list of rows."""
+        if isinstance(data, bytes):
+            if data[:2] == b"\x1f\x8b":
+                data = gzip.decompress(data)
+            data = data.decode("utf-8")
+        return list(csv.DictReader(io.StringIO(data)))
+
+    @classmethod
+    def from_files(cls, price_guide_filename, product_list_filename=None):
+        """Build the index from local (optionally gzipped) CSV files."""
+        with open(price_guide_filename, "rb") as f:
+            price_guide_rows = cls.read_csv(f.read())
+        product_list_rows = None
+        if product_list_filename:
+            with open(product_list_filename, "rb") as f:
+                product_list_rows = cls.read_csv(f.read())
+        return cls(price_guide_rows, product_list_rows)
+
+    def __contains__(self, product_id):
+        return product_id in self.prices
+
+    def __len__(self):
+        return len(self.prices)
+
+    def get(self, product_id):
+        """Product in the shape of get_product, None if it's not in the guide."""
+        price_guide = self.prices.get(product_id)
+        if price_guide is None:
+            return None
+        product = {"idProduct": product_id, "rarity": None}
+        product.update(self.products.get(product_id, {}))
+        product["priceGuide"] = price_guide
+        return {"product": product}
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Request scheduling for the Cardmarket API: daily quota budgeting and pacing.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import asyncio
+import collections
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket pacing requests to `rate` per second with bursts of `capacity`.
+
+    Tokens are taken up front and may go negative, the returned value is how
+    long the caller has to wait before its request is due. That makes the
+    bucket usable from threads and coroutines alike.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.last_refill = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        if not self.rate or self.rate <= 0:
+            return 0
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last_refill) * self.rate
+            )
+            self.last_refill = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class PyMkmRequestScheduler:
+    """Central gate for every API request, sync or async.
+
+    Keeps track of the daily quota reported in the X-Request-Limit-* headers,
+    paces requests with a token bucket and lets jobs check up front whether
+    their estimated number of calls fits in the remaining budget.
+    """
+
+    def __init__(
+        self,
+        requests_per_second=0,
+        burst=1,
+        quota_reserve=0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.bucket = TokenBucket(requests_per_second, burst, clock=clock)
+        self.quota_reserve = quota_reserve
+        self.sleep = sleep
+        self.requests_count = 0
+        self.requests_max = 0
+        self.lock = threading.Lock()
+
+    def update_quota(self, requests_count, requests_max):
+        with self.lock:
+            self.requests_count = requests_count
+            self.requests_max = requests_max
+
+    def mark_depleted(self):
+        with self.lock:
+            self.requests_count = max(self.requests_count, self.requests_max)
+
+    @property
+    def remaining_budget(self):
+        """Calls left today minus the reserve, None until the quota is known."""
+        if not self.requests_max:
+            return None
+        return max(0, self.requests_max - self.requests_count - self.quota_reserve)
+
+    def allowed_calls(self, estimated_calls):
+        """How many of estimated_calls fit in the remaining budget."""
+        remaining = self.remaining_budget
+        if remaining is None:
+            return estimated_calls
+        return min(estimated_calls, remaining)
+
+    def __take(self):
+        with self.lock:
+            # The reserve only applies to jobs, single calls may use it up
+            if self.requests_max and self.requests_count >= self.requests_max:
+                return False
+            # Count optimistically, the next response header corrects it
+            self.requests_count += 1
+            return True
+
+    def acquire(self):
+        if not self.__take():
+            return False
+        wait = self.bucket.reserve()
+        if wait > 0:
+            self.sleep(wait)
+        return True
+
+    async def acquire_async(self):
+        if not self.__take():
+            return False
+        wait = self.bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on the number of concurrent requests.
+
+    The limit grows by about one per round trip while responses are fine
+    and latency stays within `latency_tolerance` times the baseline, and is
+    multiplied by `backoff_ratio` on timeouts, server errors, 429s or
+    latency spikes. Only requests started after the last decrease can
+    decrease it again, so one burst of failures counts once. Not bound to
+    an event loop, so one limiter can be shared across batches.
+    """
+
+    def __init__(
+        self,
+        initial=10,
+        minimum=1,
+        maximum=50,
+        backoff_ratio=0.5,
+        latency_tolerance=2.0,
+        clock=time.monotonic,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.clock = clock
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.last_decrease = float("-inf")
+        self.waiters = collections.deque()
+        self.lock = threading.Lock()
+        self.counters = collections.Counter()
+        self.peak_limit = self.limit
+
+    async def acquire(self):
+        """Wait for a free slot, returns the start time to pass to release()."""
+        while True:
+            with self.lock:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return self.clock()
+                waiter = asyncio.get_running_loop().create_future()
+                self.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass on a wake-up this waiter can no longer use
+                with self.lock:
+                    self.__wake_waiters()
+                raise
+
+    def release(self, started, overloaded=False):
+        """Free the slot, overloaded=None for a request that was never sent."""
+        now = self.clock()
+        latency = now - started
+        with self.lock:
+            self.in_flight -= 1
+            if overloaded is None:
+                self.__wake_waiters()
+                return
+            self.counters["requests"] += 1
+            slow = (
+                not overloaded
+                and self.baseline_latency is not None
+                and latency > self.latency_tolerance * self.baseline_latency
+            )
+            if overloaded or slow:
+                self.counters["overloaded" if overloaded else "slow"] += 1
+                if started >= self.last_decrease and self.limit > self.minimum:
+                    self.limit = max(self.minimum, self.limit * self.backoff_ratio)
+                    self.last_decrease = now
+                    self.counters["decreases"] += 1
+            else:
+                # Track the fastest latency, drifting up slowly if it rises for good
+                if self.baseline_latency is None or latency < self.baseline_latency:
+                    self.baseline_latency = latency
+                else:
+                    self.baseline_latency += 0.05 * (latency - self.baseline_latency)
+                if self.limit < self.maximum:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                    self.counters["increases"] += 1
+                    self.peak_limit = max(self.peak_limit, self.limit)
+            self.__wake_waiters()
+
+    def __wake_waiters(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(self.__wake, waiter)
+                free -= 1
+
+    @staticmethod
+    def __wake(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "limit": int(self.limit),
+                "peak_limit": int(self.peak_limit),
+                "in_flight": self.in_flight,
+                "baseline_latency": self.baseline_latency,
+                "requests": self.counters["requests"],
+                "increases": self.counters["increases"],
+                "decreases": self.counters["decreases"],
+                "overloaded": self.counters["overloaded"],
+                "slow": self.counters["slow"],
+            }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Pooled, keep-alive HTTP session shared by all synchronous PyMkmApi calls.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests_oauthlib import OAuth1
+
+
+class PyMkmSession:
+    """Per-URL view on the pooled session, signing every request for one realm.
+
+    Exposes the subset of the OAuth1Session interface used by PyMkmApi so it
+    can be used wherever a provided_oauth session is accepted.
+    """
+
+    def __init__(self, manager, realm):
+        self.manager = manager
+        self.realm = realm
+
+    def request(self, method, url, **kwargs):
+        return self.manager.request(method, url, realm=self.realm, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        # The connection pool is owned by the manager, nothing to tear down here.
+        pass
+
+
+class PyMkmSessionManager:
+    """Owns one requests.Session with a keep-alive connection pool.
+
+    Only the OAuth realm and signature are recomputed per request, the TCP/TLS
+    connections are reused between calls.
+    """
+
+    def __init__(self, config, pool_size=10):
+        self.config = config
+        self.pool_size = pool_size
+
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def mount(self, adapter):
+        """Send every request through `adapter`, e.g. a cassette."""
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def auth_for(self, realm):
+        return OAuth1(
+            self.config["app_token"],
+            client_secret=self.config["app_secret"],
+            resource_owner_key=self.config["access_token"],
+            resource_owner_secret=self.config["access_token_secret"],
+            realm=realm,
+        )
+
+    def session_for(self, realm):
+        return PyMkmSession(self, realm)
+
+    def request(self, method, url, realm=None, **kwargs):
+        auth = self.auth_for(realm if realm is not None else url)
+        return self.session.request(method, url, auth=auth, **kwargs)
+
+    def stats(self):
+        """Connection pool statistics, summed over all hosts in the pool."""
+        new_connections = 0
+        pool_requests = 0
+        open_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            new_connections += pool.num_connections
+            pool_requests += pool.num_requests
+            idle = [conn for conn in list(pool.pool.queue) if conn is not None]
+            in_use = pool.pool.maxsize - pool.pool.qsize()
+            open_connections += in_use + sum(
+                1 for conn in idle if getattr(conn, "sock", None) is not None
+            )
+
+        reused = max(0, pool_requests - new_connections)
+        return {
+            "requests": pool_requests,
+            "new_connections": new_connections,
+            "reused_connections": reused,
+            "reuse_rate": round(reused / pool_requests, 3) if pool_requests else 0.0,
+            "open_connections": open_connections,
+            "pool_size": self.pool_size,
+        }
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Cardmarket API v2.0, for load tests and benchmarks.
+
+    python -m pymkm.pymkm_standin_server --products 100000 --stock 5000 --latency 0.05
+
+and set `base_url` in config.json to the printed URL.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import argparse
+import base64
+import csv
+import gzip
+import io
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.etree import ElementTree
+
+from pymkm.pymkmapi import PyMkmApi
+
+
+class PyMkmStandInCatalog:
+    """Synthetic, deterministic catalog: products, a stock, orders and wantslists.
+
+    Products are generated from their id on request, so catalogs of
+    hundreds of thousands of products cost no memory. Only the stock is
+    materialized, since it can be written to.
+    """
+
+    RARITIES = ["Common", "Uncommon", "Rare", "Mythic"]
+    CONDITIONS = PyMkmApi.conditions
+
+    def __init__(self, num_products=100000, stock_size=1000, num_orders=250, seed=0):
+        self.num_products = num_products
+        self.num_orders = num_orders
+        self.lock = threading.Lock()
+        rng = random.Random(seed)
+        self.stock = {}
+        for id_article in range(1, stock_size + 1):
+            id_product = rng.randint(1, num_products)
+            self.stock[id_article] = self.article(id_article, id_product, rng)
+        self.next_article_id = stock_size + 1
+
+    def product(self, id_product):
+        if not 1 <= id_product <= self.num_products:
+            return None
+        trend = round(0.02 + (id_product * 7919 % 10000) / 100, 2)
+        return {
+            "idProduct": id_product,
+            "idMetaproduct": (id_product + 1) // 2,
+            "enName": f"Card {id_product}",
+            "locName": f"Card {id_product}",
+            "expansionName": f"Expansion {id_product % 200}",
+            "rarity": self.RARITIES[id_product % len(self.RARITIES)],
+            "priceGuide": {
+                "SELL": round(trend * 1.1, 2),
+                "LOW": round(trend * 0.5, 2),
+                "LOWEX": round(trend * 0.6, 2),
+                "LOWFOIL": round(trend * 1.5, 2),
+                "AVG": round(trend * 1.05, 2),
+                "TREND": trend,
+                "TRENDFOIL": round(trend * 2, 2),
+            },
+        }
+
+    def article(self, id_article, id_product, rng=random):
+        product = self.product(id_product)
+        return {
+            "idArticle": id_article,
+            "idProduct": id_product,
+            "language": {"idLanguage": 1, "languageName": "English"},
+            "idLanguage": 1,
+            "comments": "",
+            "price": product["priceGuide"]["TREND"],
+            "count": rng.randint(1, 4),
+            "condition": rng.choice(self.CONDITIONS),
+            "isFoil": rng.random() < 0.1,
+            "isSigned": False,
+            "isPlayset": False,
+            "isAltered": False,
+            "product": {
+                "enName": product["enName"],
+                "locName": product["locName"],
+                "expansion": product["expansionName"],
+                "rarity": product["rarity"],
+            },
+        }
+
+    def product_articles(self, id_product):
+        """Other sellers' articles of a product."""
+        rng = random.Random(id_product)
+        return [
+            self.article(id_product * 100 + i, id_product, rng)
+            for i in range(rng.randint(0, 150))
+        ]
+
+    def stock_file(self):
+        output = io.StringIO()
+        writer = csv.writer(output, delimiter=";", quoting=csv.QUOTE_ALL)
+        writer.writerow(PyMkmApi.stock_csv_fieldnames)
+        with self.lock:
+            articles = list(self.stock.values())
+        for a in articles:
+            writer.writerow(
+                [
+                    a["idArticle"],
+                    a["idProduct"],
+                    a["product"]["enName"],
+                    a["product"]["locName"],
+                    "EXP",
+                    a["product"]["expansion"],
+                    a["price"],
+                    a["idLanguage"],
+                    a["condition"],
+                    "X" if a["isFoil"] else "",
+                    "",
+                    "",
+                    "",
+                    a["comments"],
+                    a["count"],
+                    0,
+                    1,
+                    "EUR",
+                ]
+            )
+        return output.getvalue()
+
+    def price_guide_file(self):
+        output = io.StringIO()
+        writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+        writer.writerow(
+            ["idProduct", "Avg. Sell Price", "Low Price", "Trend Price", "Foil Trend"]
+        )
+        for id_product in range(1, self.num_products + 1):
+            price_guide = self.product(id_product)["priceGuide"]
+            writer.writerow(
+                [
+                    id_product,
+                    price_guide["SELL"],
+                    price_guide["LOW"],
+                    price_guide["TREND"],
+                    price_guide["TRENDFOIL"],
+                ]
+            )
+        return output.getvalue()
+
+    def product_list_file(self):
+        output = io.StringIO()
+        writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+        writer.writerow(
+            ["idProduct", "Name", "Category ID", "Category", "Expansion ID"]
+        )
+        for id_product in range(1, self.num_products + 1):
+            writer.writerow(
+                [id_product, f"Card {id_product}", 1, "Magic Single", id_product % 200]
+            )
+        return output.getvalue()
+
+    def order(self, id_order):
+        rng = random.Random(id_order)
+        return {
+            "idOrder": id_order,
+            "state": {"state": "paid"},
+            "article": [
+                self.article(id_order * 10 + i, rng.randint(1, self.num_products), rng)
+                for i in range(rng.randint(1, 5))
+            ],
+        }
+
+    def write_stock(self, method, articles):
+        results = []
+        with self.lock:
+            for a in articles:
+                id_article = int(a.get("idArticle", 0))
+                if method == "POST":
+                    article = self.article(
+                        self.next_article_id, int(a.get("idProduct", 1))
+                    )
+                    self.next_article_id += 1
+                    self.stock[article["idArticle"]] = article
+                    results.append({"success": True, "idArticle": article})
+                elif id_article not in self.stock:
+                    results.append(
+                        {"success": False, "tried": a, "error": "Article not found"}
+                    )
+                elif method == "PUT":
+                    if "price" in a:
+                        self.stock[id_article]["price"] = float(a["price"])
+                    results.append(dict(self.stock[id_article], success=True))
+                else:
+                    del self.stock[id_article]
+                    results.append(
+                        {
+                            "success": True,
+                            "idArticle": id_article,
+                            "count": a.get("count"),
+                        }
+                    )
+        if method == "PUT":
+            return {
+                "updatedArticles": [x for x in results if x["success"]],
+                "notUpdatedArticles": [x for x in results if not x["success"]],
+            }
+        return {"inserted" if method == "POST" else "deleted": results}
+
+
+class StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops connections when a batch opens its pool
+    request_queue_size = 128
+
+
+class PyMkmStandInServer:
+    """ThreadingHTTPServer emulating the v2.0 endpoints PyMkmApi uses.
+
+    Supports 206 Content-Range pagination, X-Request-Limit-* headers, the
+    gzipped stock, price guide and product list files, and injected latency,
+    503 errors and 429s. Requests are not authenticated.
+    """
+
+    API_PATH = "/ws/v2.0/output.json"
+    PAGE_SIZE = 100
+
+    def __init__(
+        self,
+        catalog=None,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        error_rate=0.0,
+        too_many_requests_rate=0.0,
+        request_limit=5000,
+        seed=0,
+    ):
+        self.catalog = catalog if catalog is not None else PyMkmStandInCatalog()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.too_many_requests_rate = too_many_requests_rate
+        self.request_limit = request_limit
+        self.request_count = 0
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.httpd = StandInHTTPServer((host, port), self.__handler_class())
+        self.thread = None
+        # the price guide and product list never change, only encode them once
+        self.static_files = {}
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{self.API_PATH}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # buffered, so headers and body go out in one write instead of
+            # stalling keep-alive connections on delayed ACKs
+            wbufsize = -1
+
+            def finish(self):
+                if not self.wfile.closed:
+                    self.wfile.flush()
+                super().finish()
+
+            def do_GET(self):
+                server.handle(self)
+
+            do_PUT = do_POST = do_DELETE = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, request):
+        body = request.rfile.read(int(request.headers.get("Content-Length") or 0))
+        with self.lock:
+            self.request_count += 1
+            request_count = self.request_count
+            roll = self.random.random()
+        if self.latency:
+            time.sleep(self.latency)
+
+        headers = {
+            "X-Request-Limit-Count": str(request_count),
+            "X-Request-Limit-Max": str(self.request_limit),
+        }
+        if request_count > self.request_limit or roll < self.too_many_requests_rate:
+            return self.__respond(request, 429, None, headers)
+        if roll < self.too_many_requests_rate + self.error_rate:
+            return self.__respond(request, 503, None, headers)
+
+        url = urllib.parse.urlsplit(request.path)
+        path = (
+            url.path[len(self.API_PATH) :] if url.path.startswith(self.API_PATH) else ""
+        )
+        params = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            status, data, extra_headers = self.route(
+                request.command, path, params, body
+            )
+        except (KeyError, ValueError, ElementTree.ParseError) as err:
+            status, data, extra_headers = 400, {"mkm_error_description": str(err)}, {}
+        headers.update(extra_headers)
+        self.__respond(request, status, data, headers)
+
+    def __respond(self, request, status, data, headers):
+        content = b"" if data is None else json.dumps(data).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(content)))
+        for key, value in headers.items():
+            request.send_header(key, value)
+        request.end_headers()
+        request.wfile.write(content)
+        request.wfile.flush()
+
+    def __page(self, item_name, items, start, max_results):
+        """A 206 page of items (or 204), start is the 0-based offset."""
+        if not items:
+            return 204, None, {}
+        page = items[start : start + max_results]
+        end = start + len(page)
+        return (
+            206,
+            {item_name: page},
+            {"Content-Range": f"{start + 1}-{end}/{len(items)}"},
+        )
+
+    @staticmethod
+    def __encode_file(text):
+        return base64.b64encode(gzip.compress(text.encode("utf-8"))).decode("ascii")
+
+    def __static_file(self, name, build):
+        with self.lock:
+            if name not in self.static_files:
+                self.static_files[name] = self.__encode_file(build())
+            return self.static_files[name]
+
+    def route(self, method, path, params, body):
+        catalog = self.catalog
+        start = int(params.get("start", 0))
+        max_results = int(params.get("maxResults", self.PAGE_SIZE))
+        not_found = (404, {"mkm_error_description": "Not found"}, {})
+
+        if method in ("PUT", "POST", "DELETE") and path == "/stock":
+            articles = [
+                {child.tag: child.text for child in article}
+                for article in ElementTree.fromstring(body).iter("article")
+            ]
+            return 200, catalog.write_stock(method, articles), {}
+        if method == "PUT" and path in ("/account/vacation", "/account/language"):
+            return 200, self.__account(), {}
+        if method != "GET":
+            return not_found
+
+        if path == "/account":
+            return 200, self.__account(), {}
+        if path == "/games":
+            return 200, {"game": [{"idGame": 1, "name": "Magic the Gathering"}]}, {}
+        match = re.fullmatch(r"/games/(\d+)/expansions", path)
+        if match:
+            return (
+                200,
+                {
+                    "expansion": [
+                        {"idExpansion": i, "enName": f"Expansion {i}"}
+                        for i in range(200)
+                    ]
+                },
+                {},
+            )
+        match = re.fullmatch(r"/products/(\d+)", path)
+        if match:
+            product = catalog.product(int(match.group(1)))
+            return (200, {"product": product}, {}) if product else not_found
+        if path == "/products/find":
+            search = params.get("search", "")
+            ids = [int(x) for x in re.findall(r"\d+", search)][:1]
+            products = [catalog.product(x) for x in ids if catalog.product(x)]
+            return self.__page("product", products, start, max_results)
+        match = re.fullmatch(r"/metaproducts/(\d+)", path)
+        if match:
+            id_metaproduct = int(match.group(1))
+            products = [
+                catalog.product(x)
+                for x in (id_metaproduct * 2 - 1, id_metaproduct * 2)
+                if catalog.product(x)
+            ]
+            if not products:
+                return not_found
+            return (
+                200,
+                {
+                    "metaproduct": {
+                        "idMetaproduct": id_metaproduct,
+                        "enName": products[0]["enName"],
+                    },
+                    "product": products,
+                },
+                {},
+            )
+        match = re.fullmatch(r"/stock(?:/(\d+))?", path)
+        if match:
+            with catalog.lock:
+                articles = list(catalog.stock.values())
+            if match.group(1):
+                # /stock/:start is 1-based
+                start = int(match.group(1)) - 1
+            return self.__page("article", articles, start, max_results)
+        if path == "/stock/file":
+            return 200, {"stock": self.__encode_file(catalog.stock_file())}, {}
+        if path == "/stock/shoppingcart-articles":
+            return 200, {"article": []}, {}
+        match = re.fullmatch(r"/articles/(\d+)", path)
+        if match:
+            articles = catalog.product_articles(int(match.group(1)))
+            return self.__page("article", articles, start, max_results)
+        match = re.fullmatch(r"/users/([^/]+)/articles", path)
+        if match:
+            articles = catalog.product_articles(len(match.group(1)))
+            return self.__page("article", articles, start, max_results)
+        match = re.fullmatch(r"/orders/(\w+)/(\w+)(?:/(\d+))?", path)
+        if match:
+            if match.group(3):
+                start = int(match.group(3)) - 1
+            orders = [catalog.order(i) for i in range(1, catalog.num_orders + 1)]
+            return self.__page("order", orders, start, max_results)
+        if path == "/wantslist":
+            return 200, {"wantslist": [{"idWantsList": 1, "name": "Wants"}]}, {}
+        match = re.fullmatch(r"/wantslist/(\d+)", path)
+        if match:
+            items = [
+                {"idWant": i, "type": "metaproduct", "idMetaproduct": i}
+                for i in range(1, 21)
+            ]
+            return (
+                200,
+                {"wantslist": {"idWantsList": int(match.group(1)), "item": items}},
+                {},
+            )
+        if path == "/priceguide":
+            return (
+                200,
+                {
+                    "priceguidefile": self.__static_file(
+                        "priceguide", catalog.price_guide_file
+                    ),
+                    "idGame": 1,
+                },
+                {},
+            )
+        if path == "/productlist":
+            return (
+                200,
+                {
+                    "productsfile": self.__static_file(
+                        "productlist", catalog.product_list_file
+                    )
+                },
+                {},
+            )
+        return not_found
+
+    @staticmethod
+    def __account():
+        return {
+            "account": {
+                "idUser": 1,
+                "username": "standin",
+                "country": "SE",
+                "onVacation": False,
+                "idDisplayLanguage": "1",
+            }
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Cardmarket API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--stock", type=int, default=1000)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per request."
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 503s.")
+    parser.add_argument(
+        "--429-rate", dest="too_many_requests_rate", type=float, default=0.0
+    )
+    parser.add_argument("--request-limit", type=int, default=5000)
+    args = parser.parse_args()
+
+    server = PyMkmStandInServer(
+        PyMkmStandInCatalog(args.products, args.stock),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        too_many_requests_rate=args.too_many_requests_rate,
+        request_limit=args.request_limit,
+    )
+    print(f"Serving the Cardmarket stand-in at {server.base_url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Columnar stock and price guide data for repricing a whole stock at once.
+
+Needs NumPy, which is optional: without it `PyMkmStockTable.available()` is
+False and the app prices one article at a time.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import operator
+
+from pymkm.pymkm_models import SlotRecord
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class PyMkmStockTable:
+    """Stock articles and their products' prices as NumPy columns.
+
+    Computes the default repricing, the price changes and the stock value
+    for all articles at once. Conditions and rarities are stored as codes into `conditions` and
+    `rarities`, so discounts and rounding limits are looked up once per
+    distinct value instead of once per article.
+    """
+
+    def __init__(self, articles, products):
+        """Columns for `articles`, priced with `products` (keyed by idProduct).
+
+        Each article needs its product in `products`.
+        """
+        if np is None:
+            raise ImportError("PyMkmStockTable needs NumPy (pip install numpy).")
+        self.articles = articles
+        num_articles = len(articles)
+        # Read fields with C level getters, article records are not dicts
+        getter = (
+            operator.attrgetter
+            if articles and isinstance(articles[0], SlotRecord)
+            else operator.itemgetter
+        )
+
+        def column(values, dtype):
+            return np.fromiter(values, dtype=dtype, count=num_articles)
+
+        def flag(key):
+            values = map(operator.methodcaller("get", key, False), articles)
+            return column(map(bool, values), np.bool_)
+
+        def codes(values):
+            distinct = list(dict.fromkeys(values))
+            code = {value: i for i, value in enumerate(distinct)}
+            return distinct, column(map(code.__getitem__, values), np.int16)
+
+        product_ids = list(map(getter("idProduct"), articles))
+        conditions = list(map(getter("condition"), articles))
+        self.columns = {
+            "idArticle": column(map(getter("idArticle"), articles), np.int64),
+            "idProduct": column(product_ids, np.int64),
+            "price": column(map(getter("price"), articles), np.float64),
+            "count": column(map(getter("count"), articles), np.int64),
+            "foil": flag("isFoil"),
+            "playset": flag("isPlayset"),
+        }
+        self.conditions, self.columns["condition"] = codes(conditions)
+
+        # Products are looked up once each, however many articles share them
+        product_row = {
+            product_id: i for i, product_id in enumerate(dict.fromkeys(product_ids))
+        }
+        distinct_products = [
+            products[product_id]["product"] for product_id in product_row
+        ]
+        rows = column(map(product_row.__getitem__, product_ids), np.intp)
+        for key in ("TREND", "TRENDFOIL"):
+            # missing prices (None) become NaN
+            prices = np.array(
+                [product["priceGuide"][key] for product in distinct_products],
+                dtype=np.float64,
+            )
+            self.columns[key] = prices[rows]
+
+        # imported here, pymkm_calculators imports this module
+        from pymkm.pymkm_calculators import PriceBatch
+
+        product_rarities = [
+            PriceBatch.rarity(products[product_id]) for product_id in product_row
+        ]
+        rarities = [product_rarities[row] for row in rows.tolist()]
+        self.rarities, self.columns["rarity"] = codes(rarities)
+        # the first product of each rarity, for warnings about unknown rarities
+        first_products = dict(zip(reversed(rarities), reversed(product_ids)))
+        self.rarity_product_ids = [first_products[r] for r in self.rarities]
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    def __len__(self):
+        return len(self.articles)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def calculate_prices(self, discount_for_condition, rounding_limit_for_rarity):
+        """New prices for every article, as DefaultPriceCalculator would set them.
+
+        `discount_for_condition(condition)` and
+        `rounding_limit_for_rarity(rarity, product_id)` are called once per
+        distinct condition and rarity. Raises ValueError if an article's
+        product has no trend price.
+        """
+        discounts = np.array(
+            [discount_for_condition(c) for c in self.conditions], dtype=np.float64
+        )
+        limits = np.array(
+            [
+                rounding_limit_for_rarity(rarity, product_id)
+                for rarity, product_id in zip(self.rarities, self.rarity_product_ids)
+            ],
+            dtype=np.float64,
+        )
+        prices = np.where(self["foil"], self["TRENDFOIL"], self["TREND"])
+        if np.isnan(prices).any():
+            raise ValueError("No price found!")
+        prices = np.where(self["playset"], 4 * prices, prices)
+        # Apply condition discount
+        prices = prices * discounts[self["condition"]]
+        # Round up to a multiple of the rarity's limit
+        inverse_limits = 1 / limits[self["rarity"]]
+        return np.round(np.ceil(prices * inverse_limits) / inverse_limits, 2)
+
+    def price_changes(self, new_prices):
+        """Indices of the articles whose price changes, and the differences.
+
+        A new price of 0 or None (NaN) is no price, it changes nothing.
+        """
+        new_prices = np.asarray(new_prices, dtype=np.float64)
+        diff = new_prices - self["price"]
+        changed = np.flatnonzero((new_prices != 0) & (diff != 0) & ~np.isnan(diff))
+        return changed, diff[changed]
+
+    def stock_value(self, new_prices):
+        """Value of the articles at their new prices, or old ones if there are none."""
+        new_prices = np.asarray(new_prices, dtype=np.float64)
+        has_price = (new_prices != 0) & ~np.isnan(new_prices)
+        prices = np.where(has_price, new_prices, self["price"])
+        return float((prices * self["count"]).sum())
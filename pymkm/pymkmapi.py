@@ -13,19 +13,29 @@ import copy
 import json
 import logging
 import logging.handlers
+from pymkm.pymkm_cache import PyMkmResponseCache
+from pymkm.pymkm_cassette import CassetteAdapter, CassetteTransport, PyMkmCassette
 from pymkm.pymkm_helper import PyMkmHelper
+from pymkm.pymkm_metrics import PyMkmMetrics
+from pymkm.pymkm_priceguide import PyMkmPriceGuide
+from pymkm.pymkm_scheduler import AdaptiveConcurrencyLimiter, PyMkmRequestScheduler
+from pymkm.pymkm_session import PyMkmSessionManager
 import re
 import sys
+import random
+import threading
 import urllib.parse
 import base64, zlib
 import csv
-import codecs
+import collections
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from json import JSONDecodeError
 from authlib.integrations.httpx_client import AsyncOAuth1Client, OAuth1Auth
 from requests import ConnectionError
-from requests_oauthlib import OAuth1Session
 
 
 class CardmarketError(Exception):
@@ -47,10 +57,48 @@ class CardmarketError(Exception):
         return prefix_string + error_string
 
 
+class QuotaExceededError(CardmarketError):
+    def __init__(self, message, allowed=0, url=None, errors=None):
+        super().__init__(message, url=url, errors=errors)
+
+        self.allowed = allowed
+
+
+class BatchResult(list):
+    """The successful responses of an async batch, in request order.
+
+    Items that failed are kept in `failures`, mapping item id to the reason.
+    """
+
+    def __init__(self, successes=(), failures=None):
+        super().__init__(successes)
+        self.failures = failures if failures is not None else {}
+
+
+class BatchResultDict(dict):
+    """The successful responses of an async batch, keyed by item id.
+
+    Items that failed are kept in `failures`, mapping item id to the reason.
+    """
+
+    def __init__(self, successes=(), failures=None):
+        super().__init__(successes)
+        self.failures = failures if failures is not None else {}
+
+
 class PyMkmApi:
     logger = None
     config = None
     base_url = "https://api.cardmarket.com/ws/v2.0/output.json"
+    MAX_BACKOFF_SECONDS = 10
+    # Result keys of the stock endpoints, for successful and failed articles
+    STOCK_WRITE_RESULT_KEYS = {
+        "put": ("updatedArticles", "notUpdatedArticles"),
+        "post": ("inserted", "inserted"),
+        "delete": ("deleted", "deleted"),
+    }
+    # JSON string escapes found in the encoded files (PHP escapes "/")
+    JSON_ESCAPES = {b"/": b"/", b"\\": b"\\", b'"': b'"', b"n": b"\n", b"r": b"\r"}
     conditions = ["MT", "NM", "EX", "GD", "LP", "PL", "PO"]
     languages = [
         "N/A",
@@ -129,8 +177,125 @@ class PyMkmApi:
                 sys.exit(0)
         else:
             self.config = config
-    
-    def __get_json(self, response, item_ref=None):
+
+        # e.g. a local stand-in server (pymkm_standin_server) for load tests
+        self.base_url = self.config.get("base_url") or self.base_url
+        self.session_manager = PyMkmSessionManager(
+            self.config, pool_size=self.config.get("api_connection_pool_size", 10)
+        )
+        # Record the traffic to, or replay it from, api_cassette_filename
+        self.cassette = PyMkmCassette.from_config(self.config)
+        if self.cassette is not None:
+            self.session_manager.mount(
+                CassetteAdapter(self.cassette, self.session_manager.adapter)
+            )
+        self.cache = PyMkmResponseCache(
+            self.config.get("api_cache_filename", "local_pymkm_responses.db"),
+            ttl=self.config.get("api_cache_ttl"),
+            max_entries=self.config.get("api_cache_max_entries", 50000),
+            enabled=self.config.get("api_cache_enabled", True),
+        )
+        self.scheduler = PyMkmRequestScheduler(
+            requests_per_second=self.config.get("api_requests_per_second", 0),
+            burst=self.config.get("api_request_burst", 1),
+            quota_reserve=self.config.get("api_quota_reserve", 0),
+        )
+        self.metrics = PyMkmMetrics(self.base_url)
+        # Learns how many concurrent requests Cardmarket handles well,
+        # across batches
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=self.config.get("api_async_initial_concurrency", 10),
+            maximum=self.config["api_async_semaphore_value"],
+            latency_tolerance=self.config.get("api_async_latency_tolerance", 2.0),
+        )
+        # Async batches run on a background loop with one long-lived client
+        self.async_client = None
+        # (event loop, item type, id) -> future of the request currently
+        # fetching it. Batches on different loops (threads) never share an
+        # entry, so each loop only touches its own futures.
+        self.__in_flight = {}
+        self.__loop = None
+        self.__loop_thread = None
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """Start the event loop thread and the async client used by the *_async methods.
+
+        Called on first use, calling it up front moves the warm-up out of the
+        first batch.
+        """
+        with self.__lock:
+            if self.__loop is None:
+                self.__loop = asyncio.new_event_loop()
+                self.__loop_thread = threading.Thread(
+                    target=self.__loop.run_forever, name="pymkm-async", daemon=True
+                )
+                self.__loop_thread.start()
+            if self.async_client is None:
+                client = self._async_client()
+                asyncio.run_coroutine_threadsafe(
+                    client.__aenter__(), self.__loop
+                ).result()
+                self.async_client = client
+        return self
+
+    def close(self):
+        """Close the async client, its event loop and the pooled sessions."""
+        with self.__lock:
+            if self.__loop is not None:
+                if self.async_client is not None:
+                    asyncio.run_coroutine_threadsafe(
+                        self.async_client.__aexit__(None, None, None), self.__loop
+                    ).result()
+                    self.async_client = None
+                self.__loop.call_soon_threadsafe(self.__loop.stop)
+                self.__loop_thread.join()
+                self.__loop.close()
+                self.__loop = None
+                self.__loop_thread = None
+        self.session_manager.close()
+        self.cache.close()
+        if self.cassette is not None and self.cassette.recording:
+            self.cassette.save()
+        metrics_filename = self.config.get("metrics_filename")
+        if metrics_filename:
+            self.metrics.dump(metrics_filename)
+
+    def get_connection_stats(self):
+        stats = self.session_manager.stats()
+        self.logger.debug(
+            f">> Connection pool: {stats['open_connections']} open, reuse rate {stats['reuse_rate']}"
+        )
+        return stats
+
+    def get_concurrency_stats(self):
+        stats = self.limiter.stats()
+        self.logger.debug(
+            f">> Async concurrency: limit {stats['limit']} (peak {stats['peak_limit']}), {stats['decreases']} backoffs"
+        )
+        return stats
+
+    def reserve_quota(self, estimated_calls, job_name="job"):
+        """Check that a job fits in today's remaining quota before it starts.
+
+        Raises QuotaExceededError, with the number of calls that would fit in
+        `allowed`, so the caller can refuse the job or defer part of it.
+        """
+        allowed = self.scheduler.allowed_calls(estimated_calls)
+        if allowed < estimated_calls:
+            raise QuotaExceededError(
+                f"{job_name} needs {estimated_calls} API calls, {allowed} left in today's quota.",
+                allowed=allowed,
+            )
+        return allowed
+
+    def _get_json(self, response, item_ref=None):
         json_data = None
         try:
             json_data = response.json()
@@ -145,7 +310,7 @@ class PyMkmApi:
             else:
                 return json_data
 
-    def __handle_response(self, response):
+    def _handle_response(self, response):
         handled_codes = (
             requests.codes.ok,
             requests.codes.partial_content,
@@ -162,15 +327,18 @@ class PyMkmApi:
         elif response.status_code == requests.codes.not_found:
             raise CardmarketError(response.json())
         elif response.status_code == requests.codes.too_many_requests:
-            raise CardmarketError("Request quota depleted. :(")
+            self.scheduler.mark_depleted()
+            raise QuotaExceededError("Request quota depleted. :(")
             sys.exit(0)
         else:
             raise requests.exceptions.ConnectionError(response)
 
-    def __read_request_limits_from_header(self, response):
+    def _read_request_limits_from_header(self, response):
         try:
             self.requests_count = int(response.headers["X-Request-Limit-Count"])
             self.requests_max = int(response.headers["X-Request-Limit-Max"])
+            self.scheduler.update_quota(self.requests_count, self.requests_max)
+            self.metrics.record_quota(self.requests_count, self.requests_max)
             self.logger.debug(f">> Quota: {self.requests_count}/{self.requests_max}")
         except (AttributeError, KeyError) as err:
             self.logger.debug(f">> Attribute not found in header: {err}")
@@ -180,20 +348,50 @@ class PyMkmApi:
             return provided_oauth
         else:
             if self.config is not None:
-                oauth = OAuth1Session(
-                    self.config["app_token"],
-                    client_secret=self.config["app_secret"],
-                    resource_owner_key=self.config["access_token"],
-                    resource_owner_secret=self.config["access_token_secret"],
-                    realm=url,
-                )
+                # Reuses the pooled connections, only the realm is per-URL
+                oauth = self.session_manager.session_for(url)
 
                 if oauth is None:
                     raise ConnectionError("Failed to establish OAuth session.")
                 else:
                     return oauth
 
-    def __get_max_items_from_header(self, response):
+    def __send(self, mkm_oauth, method, url, **kwargs):
+        # Every synchronous request goes through the scheduler
+        if not self.scheduler.acquire():
+            raise QuotaExceededError("Request quota depleted. :(", url=url)
+        started = time.perf_counter()
+        stream = kwargs.get("stream", False)
+        try:
+            r = getattr(mkm_oauth, method)(url, **kwargs)
+        except Exception:
+            self._record_request(url, started, None, kwargs.get("data"))
+            raise
+        self._record_request(url, started, r, kwargs.get("data"), stream)
+        self._read_request_limits_from_header(r)
+        return r
+
+    def _record_request(self, url, started, response, content=None, stream=False):
+        """Record a request started at `started` (perf_counter) in the metrics.
+
+        The body of a `stream`ed response isn't read, its Content-Length is
+        counted instead.
+        """
+        if response is None:
+            received = 0
+        elif stream:
+            received = int(response.headers.get("Content-Length") or 0)
+        else:
+            received = len(response.content or "")
+        self.metrics.record(
+            url,
+            "error" if response is None else response.status_code,
+            time.perf_counter() - started,
+            len(content or ""),
+            received,
+        )
+
+    def _get_max_items_from_header(self, response):
         max_items = 0
         if not response.status_code == requests.codes.no_content:
             try:
@@ -212,31 +410,49 @@ class PyMkmApi:
             raise Exception("Configuration error (search_filters, language).")
 
     @staticmethod
-    def __chunks(l, n):
+    def _chunks(l, n):
         # For item i in a range that is a length of l,
         for i in range(0, len(l), n):
             # Create an index range for l of n items:
             yield l[i : i + n]
 
-    def get_games(self, provided_oauth=None):
+    def get_games(self, provided_oauth=None, use_cache=True):
         url = f"{self.base_url}/games"
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
         self.logger.debug(">> Getting all games")
+        return self.__get_cacheable("games", "all", url, provided_oauth, use_cache)
+
+    def __get_cacheable(self, resource, item_id, url, provided_oauth, use_cache):
+        """GET a resource through the response cache, use_cache=False bypasses it."""
+        if use_cache:
+            cached = self.cache.get(resource, item_id)
+            if cached is not None:
+                self.logger.debug(f">> Cache hit for {resource} {item_id}")
+                return cached
+
+        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
         r = self.mkm_request(mkm_oauth, url)
 
         if r:
-            return self.__get_json(r)
+            json_data = self._get_json(r)
+            if r.status_code == requests.codes.ok and json_data is not None:
+                self.cache.put(resource, item_id, json_data)
+            return json_data
 
-    def mkm_request(self, mkm_oauth, url, params=None):
+    def mkm_request(self, mkm_oauth, url, params=None, stream=False):
         try:
-            r = mkm_oauth.get(url, params=params, allow_redirects=False)
-            self.__read_request_limits_from_header(r)
+            r = self.__send(
+                mkm_oauth,
+                "get",
+                url,
+                params=params,
+                allow_redirects=False,
+                stream=stream,
+            )
             # However, you should switch off the behaviour to automatically
             # redirect to the given request URI, because a new Authorization
             # header needs to be compiled for the redirected resource. (MKM API docs)
-            self.__handle_response(r)
-            mkm_oauth.close()
+            self._handle_response(r)
             return r
         except CardmarketError as err:
             self.logger.error(f"{err.mkm_msg()} {url}")
@@ -246,15 +462,13 @@ class PyMkmApi:
             self.logger.error(f"{err} for {url}")
             # sys.exit(0)
 
-    def get_expansions(self, game_id, provided_oauth=None):
+    def get_expansions(self, game_id, provided_oauth=None, use_cache=True):
         url = f"{self.base_url}/games/{str(game_id)}/expansions"
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
         self.logger.debug(">> Getting all expansions for game id " + str(game_id))
-        r = self.mkm_request(mkm_oauth, url)
-
-        if r:
-            return self.__get_json(r)
+        return self.__get_cacheable(
+            "expansions", game_id, url, provided_oauth, use_cache
+        )
 
     def get_cards_in_expansion(self, expansion_id, provided_oauth=None):
         # Response: Expansion with Product objects
@@ -265,89 +479,281 @@ class PyMkmApi:
         r = self.mkm_request(mkm_oauth, url)
 
         if r:
-            return self.__get_json(r)
+            return self._get_json(r)
 
-    def get_product(self, product_id, provided_oauth=None):
+    def get_product(self, product_id, provided_oauth=None, use_cache=True):
         url = f"{self.base_url}/products/{str(product_id)}"
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
         self.logger.debug(f">> Getting data for product id {str(product_id)}")
-        r = self.mkm_request(mkm_oauth, url)
+        return self.__get_cacheable(
+            "products", product_id, url, provided_oauth, use_cache
+        )
 
-        if r:
-            return self.__get_json(r)
+    def _retry_delay(self, attempt):
+        """Jittered exponential backoff in seconds before retry number `attempt`."""
+        backoff = self.config.get("api_async_backoff", 0.5)
+        return random.uniform(
+            0, min(self.MAX_BACKOFF_SECONDS, backoff * 2 ** (attempt - 1))
+        )
 
-    async def fetch(self, sem, client, url, uri, item_type, item_id, progressbar=None):
-        async with sem:
-            self.logger.debug(f"Started fetch on {item_type} {item_id}")
-            client_auth = copy.copy(client.auth)
-            client_auth.realm = url
+    async def fetch(
+        self,
+        limiter,
+        client,
+        url,
+        uri,
+        item_type,
+        item_id,
+        progressbar=None,
+        retries=0,
+    ):
+        """Fetch one item, retrying transient failures with jittered exponential backoff.
+
+        Returns a (json, failure_reason, retryable) tuple, failure_reason is
+        None on success. `limiter` is an AdaptiveConcurrencyLimiter that is told
+        how each request went.
+        """
+        json_data, reason, retryable = None, None, False
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                # Sleep outside the limiter so other items keep going
+                delay = self._retry_delay(attempt)
+                self.logger.debug(
+                    f"Retrying {item_type} {item_id} in {delay:0.2f}s ({reason})"
+                )
+                await asyncio.sleep(delay)
+                self.metrics.record_retry(url)
+            # Wait for the token bucket first, so pacing doesn't count as latency
+            if not await self.scheduler.acquire_async():
+                json_data, reason, retryable = None, "quota depleted", False
+                break
+            started = await limiter.acquire()
+            overloaded = None
             try:
-                time_start = time.perf_counter()
-                resp = await client.get(url, auth=client_auth)
-                self.__read_request_limits_from_header(resp)
-            except Exception as err:
-                pass
-                # self.logger.error(f"Timeout on {item_type} {item_id}")
+                json_data, reason, retryable, overloaded = await self.__fetch_once(
+                    client, url, item_type, item_id
+                )
+            finally:
+                limiter.release(started, overloaded)
+            if reason is None or not retryable:
+                break
+
+        if progressbar:
+            progressbar.update(progressbar.value + 1)  # HACK: is this "thread safe"?
+        return json_data, reason, retryable
+
+    async def __fetch_once(self, client, url, item_type, item_id):
+        """Returns (json, failure_reason, retryable, overloaded)."""
+        self.logger.debug(f"Started fetch on {item_type} {item_id}")
+        client_auth = copy.copy(client.auth)
+        client_auth.realm = url
+        time_start = time.perf_counter()
+        try:
+            resp = await client.get(url, auth=client_auth)
+        except Exception as err:
+            self._record_request(url, time_start, None)
+            return None, f"{type(err).__name__}: {err}", True, True
+        self._record_request(url, time_start, resp)
+        self._read_request_limits_from_header(resp)
+
+        if resp.status_code == requests.codes.too_many_requests:
+            self.scheduler.mark_depleted()
+            return None, "quota depleted", False, True
+        elif resp.status_code >= 500:
+            return None, f"HTTP {resp.status_code}", True, True
+        elif resp.status_code != requests.codes.ok:
+            return None, f"HTTP {resp.status_code}", False, False
+
+        try:
+            time_done = time.perf_counter()
+            json_data = resp.json()
+            self.logger.debug(
+                f"Got result for {item_type} {item_id} in {time_done - time_start:0.2f} seconds"
+            )
+            return json_data, None, False, False
+        except JSONDecodeError as err:
+            self.logger.error(f"Error in async fetch: {err.msg}")
+            return None, f"invalid JSON: {err.msg}", True, False
+
+    async def get_items(
+        self,
+        item_type,
+        item_id_list,
+        progressbar=None,
+        use_cache=True,
+        client=None,
+        as_dict=False,
+    ):
+        """Fetch items concurrently, pass a long-lived `client` to reuse its connections.
+
+        Every id is requested once, duplicates and ids already being fetched
+        by a concurrent call on the same event loop share that request. The
+        result still has an entry per requested id, or is keyed by id with
+        `as_dict`.
+        """
+        unique_ids = list(dict.fromkeys(item_id_list))
+        cached = {}
+        if use_cache:
+            cached = self.cache.get_many(item_type, unique_ids)
+        if progressbar:
+            # Only the fetched items advance the bar by themselves
+            progressbar.update(
+                progressbar.value
+                + len(item_id_list)
+                - len(unique_ids)
+                + sum(1 for x in unique_ids if x in cached)
+            )
+
+        loop = asyncio.get_running_loop()
+        shared = {}
+        to_fetch = []
+        for item_id in unique_ids:
+            if item_id in cached:
+                continue
+            future = self.__in_flight.get((loop, item_type, item_id))
+            if future is not None:
+                shared[item_id] = future
             else:
-                try:
-                    time_done = time.perf_counter()
-                    json = resp.json()
-                    self.logger.debug(
-                        f"Got result for {item_type} {item_id} in {time_done - time_start:0.2f} seconds"
+                self.__in_flight[(loop, item_type, item_id)] = loop.create_future()
+                to_fetch.append(item_id)
+
+        fetched = {}
+        try:
+            if to_fetch and client is None:
+                async with self._async_client() as client:
+                    fetched = await self.__fetch_items(
+                        item_type, to_fetch, client, progressbar
                     )
-                    return json
-                except JSONDecodeError as err:
-                    self.logger.error(f"Error in async fetch: {err.msg}")
-            finally:
+            elif to_fetch:
+                fetched = await self.__fetch_items(
+                    item_type, to_fetch, client, progressbar
+                )
+        finally:
+            for item_id in to_fetch:
+                future = self.__in_flight.pop((loop, item_type, item_id))
+                future.set_result(fetched.get(item_id, (None, "cancelled")))
+
+        if shared:
+            self.logger.debug(
+                f"Waiting for {len(shared)} {item_type} already in flight"
+            )
+            for item_id, response in zip(
+                shared, await asyncio.gather(*shared.values())
+            ):
+                fetched[item_id] = response
                 if progressbar:
-                    progressbar.update(
-                        progressbar.value + 1
-                    )  # HACK: is this "thread safe"?
+                    progressbar.update(progressbar.value + 1)
+
+        self.cache.put_many(
+            item_type,
+            {
+                item_id: json_data
+                for item_id, (json_data, reason) in fetched.items()
+                if reason is None
+            },
+        )
 
-    async def get_items(self, item_type, item_id_list, progressbar=None):
-        async with AsyncOAuth1Client(
-            client_id=self.config["app_token"],
-            client_secret=self.config["app_secret"],
-            token=self.config["access_token"],
-            token_secret=self.config["access_token_secret"],
-            timeout=self.config["cardmarket_request_timeout"],
-        ) as client:
-            tasks = []
-            sem = asyncio.Semaphore(self.config["api_async_semaphore_value"])
+        if as_dict:
+            result = BatchResultDict(cached)
+            for item_id, (json_data, reason) in fetched.items():
+                if reason is None:
+                    result[item_id] = json_data
+                else:
+                    result.failures[item_id] = reason
+        else:
+            result = BatchResult()
             for item_id in item_id_list:
-                tasks.append(
-                    asyncio.ensure_future(
-                        self.fetch(
-                            sem,
-                            client,
-                            f"{self.base_url}/{item_type}/{str(item_id)}",
-                            f"{self.base_url}/{item_type}/",
-                            item_type,
-                            item_id,
-                            progressbar,
-                        )
+                if item_id in cached:
+                    result.append(cached[item_id])
+                else:
+                    json_data, reason = fetched[item_id]
+                    if reason is None:
+                        result.append(json_data)
+                    else:
+                        result.failures[item_id] = reason
+        if result.failures:
+            self.logger.warning(
+                f"{len(result.failures)} of {len(item_id_list)} {item_type} failed"
+            )
+        return result
+
+    async def __fetch_items(self, item_type, item_id_list, client, progressbar=None):
+        """Fetch items from the API, returns {item_id: (json, failure_reason)}."""
+        retries = self.config.get("api_async_retries", 3)
+
+        def fetch_all(item_ids, limiter, bar):
+            return asyncio.gather(
+                *[
+                    self.fetch(
+                        limiter,
+                        client,
+                        f"{self.base_url}/{item_type}/{str(item_id)}",
+                        f"{self.base_url}/{item_type}/",
+                        item_type,
+                        item_id,
+                        bar,
+                        retries,
                     )
-                )
-            responses = await asyncio.gather(*tasks, return_exceptions=False)
-            return responses
+                    for item_id in item_ids
+                ]
+            )
 
-    def get_items_async(self, item_type, item_id_list, progressbar=None):
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(
-            self.get_items(item_type, item_id_list, progressbar)
+        responses = await fetch_all(item_id_list, self.limiter, progressbar)
+
+        # Final pass for stragglers, at a lower concurrency
+        stragglers = [
+            index
+            for index, (json_data, reason, retryable) in enumerate(responses)
+            if reason is not None and retryable
+        ]
+        if stragglers:
+            self.logger.warning(
+                f"Retrying {len(stragglers)} {item_type} in a final straggler pass"
+            )
+            straggler_responses = await fetch_all(
+                [item_id_list[index] for index in stragglers],
+                AdaptiveConcurrencyLimiter(
+                    initial=1, maximum=max(1, self.limiter.maximum // 10)
+                ),
+                None,
+            )
+            for index, response in zip(stragglers, straggler_responses):
+                responses[index] = response
+
+        self.get_concurrency_stats()
+        return {
+            item_id: (json_data, reason)
+            for item_id, (json_data, reason, retryable) in zip(item_id_list, responses)
+        }
+
+    def get_items_async(
+        self, item_type, item_id_list, progressbar=None, use_cache=True, as_dict=False
+    ):
+        self.open()
+        return self.__run_async(
+            self.get_items(
+                item_type,
+                item_id_list,
+                progressbar,
+                use_cache,
+                self.async_client,
+                as_dict,
+            )
         )
 
-    def get_metaproduct(self, metaproduct_id, provided_oauth=None):
+    def __run_async(self, coroutine):
+        # Runs on the background loop, so this also works when the caller
+        # is itself inside a running event loop
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop).result()
+
+    def get_metaproduct(self, metaproduct_id, provided_oauth=None, use_cache=True):
         ## https://api.cardmarket.com/ws/v2.0/metaproducts/:idMetaproduct
         url = f"{self.base_url}/metaproducts/{str(metaproduct_id)}"
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
         self.logger.debug(">> Getting data for metaproduct id " + str(metaproduct_id))
-        r = self.mkm_request(mkm_oauth, url)
-
-        if r:
-            return self.__get_json(r)
+        return self.__get_cacheable(
+            "metaproducts", metaproduct_id, url, provided_oauth, use_cache
+        )
 
     def get_account(self, provided_oauth=None):
         url = f"{self.base_url}/account"
@@ -356,8 +762,8 @@ class PyMkmApi:
         self.logger.debug(">> Getting account details")
         r = self.mkm_request(mkm_oauth, url)
 
-        if self.__handle_response(r):
-            return self.__get_json(r)
+        if self._handle_response(r):
+            return self._get_json(r)
 
     def get_articles_in_shoppingcarts(self, provided_oauth=None):
         url = f"{self.base_url}/stock/shoppingcart-articles"
@@ -367,7 +773,7 @@ class PyMkmApi:
         r = self.mkm_request(mkm_oauth, url)
 
         if r:
-            return self.__get_json(r)
+            return self._get_json(r)
 
     def set_vacation_status(self, vacation_status=False, provided_oauth=None):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Account_Vacation
@@ -375,13 +781,15 @@ class PyMkmApi:
         mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
         self.logger.debug(">> Setting vacation status to: " + str(vacation_status))
-        r = mkm_oauth.put(url, params={"onVacation": str(vacation_status).lower()})
+        r = self.__send(
+            mkm_oauth, "put", url, params={"onVacation": str(vacation_status).lower()}
+        )
         mkm_oauth.close()
         # cancelOrders
         # relistItems
 
-        if self.__handle_response(r):
-            return self.__get_json(r)
+        if self._handle_response(r):
+            return self._get_json(r)
 
     def set_display_language(self, display_language=1, provided_oauth=None):
         # 1: English, 2: French, 3: German, 4: Spanish, 5: Italian
@@ -389,15 +797,16 @@ class PyMkmApi:
         mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
         self.logger.debug(">> Setting display language to: " + str(display_language))
-        r = mkm_oauth.put(url, params={"idDisplayLanguage": display_language})
+        r = self.__send(
+            mkm_oauth, "put", url, params={"idDisplayLanguage": display_language}
+        )
         mkm_oauth.close()
 
-        if self.__handle_response(r):
-            return self.__get_json(r)
+        if self._handle_response(r):
+            return self._get_json(r)
 
     def add_stock(self, payload=None, provided_oauth=None):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Stock_Management
-        url = f"{self.base_url}/stock"
 
         # idProduct
         # count
@@ -411,52 +820,29 @@ class PyMkmApi:
         # isPlayset
         # isFirstEd
 
-        # clean data because the API treats "False" as true, must be "false".
-        for entry in payload:
-            for key, value in entry.items():
-                if isinstance(value, bool):
-                    entry[key] = str.lower(str(value))
-
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
-
         self.logger.debug(">> Adding stock")
-        chunked_list = list(self.__chunks(payload, 100))
-        r = None
-        for chunk in chunked_list:
-            # chunk[0]["comments"] = "DO NOT BUY"  # HACK: temp comment for testing
-            try:
-                xml_payload = PyMkmHelper.dicttoxml(chunk)
-                r = mkm_oauth.post(
-                    url,
-                    data=xml_payload,
-                    timeout=self.config["cardmarket_request_timeout"],
-                )
-                mkm_oauth.close()
-                inserted = self.__get_json(r)
-                if "error" in inserted:
-                    raise CardmarketError(inserted["error"])
-                else:
-                    for item in inserted["inserted"]:
-                        if not item["success"]:
-                            raise CardmarketError(
-                                f"{item['error']}: {item['tried']}"  # , url=r.request.url
-                            )
-                        else:
-                            self.logger.debug(
-                                f">> Added {item['idArticle']['product']['enName']}."
-                            )
-
-            except CardmarketError as err:
-                self.logger.error(f"{err.mkm_msg()} {err.url}")
-                # print(err.mkm_msg())
-        # TODO: Only considers the last response.
-        if self.__handle_response(r):
-            return self.__get_json(r)
+        return self.write_stock_async("post", payload, provided_oauth)
 
     def set_stock(self, payload=None, provided_oauth=None):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Stock_Management
-        url = f"{self.base_url}/stock"
+        self.logger.debug(">> Updating stock")
+        return self.write_stock_async("put", payload, provided_oauth)
 
+    def delete_stock(self, payload=None, provided_oauth=None):
+        ## https://api.cardmarket.com/ws/documentation/API_2.0:Stock_Management
+        self.logger.debug(">> Deleting stock")
+        return self.write_stock_async("delete", payload, provided_oauth)
+
+    def write_stock_async(self, method, payload, provided_oauth=None):
+        self.open()
+        return self.__run_async(
+            self.write_stock(method, payload, provided_oauth, self.async_client)
+        )
+
+    def _clean_stock_payload(self, method, payload):
+        if method == "delete":
+            return payload
+        # Only these can be changed on existing articles
         allowed_items = [
             "idArticle",
             "idLanguage",
@@ -471,74 +857,243 @@ class PyMkmApi:
         # clean data because the API treats "False" as true, must be "false".
         clean_payload = []
         for entry in payload:
-            clean_entry = {k: v for k, v in entry.items() if k in allowed_items}
+            if method == "put":
+                entry = {k: v for k, v in entry.items() if k in allowed_items}
 
-            for key, value in clean_entry.items():
+            for key, value in entry.items():
                 if isinstance(value, bool):
-                    clean_entry[key] = str.lower(str(value))
-            clean_payload.append(clean_entry)
+                    entry[key] = str.lower(str(value))
+            clean_payload.append(entry)
+        return clean_payload
+
+    def _log_stock_write_result(self, method, result):
+        if method == "post":
+            for item in result.get("inserted", []):
+                if not item["success"]:
+                    self.logger.error(
+                        f"[Cardmarket API] {item.get('error')}: {item.get('tried')}"
+                    )
+                else:
+                    self.logger.debug(
+                        f">> Added {item['idArticle']['product']['enName']}."
+                    )
+        elif method == "put":
+            for success in result.get("updatedArticles", []):
+                self.logger.debug(
+                    f"Updated price for aid: {success['idArticle']}, pid: {success['idProduct']}, {success['product']['enName']})."
+                )
+            for failure in result.get("notUpdatedArticles", []):
+                self.logger.warning(
+                    f"Failed update price for aid: {failure['tried'].get('idArticle')} ({failure.get('error')})."
+                )
+        else:
+            for failure in (x for x in result.get("deleted", []) if not x["success"]):
+                self.logger.warning(
+                    f"Failed to delete aid: {failure.get('idArticle')} ({failure.get('message')})."
+                )
 
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
+    @staticmethod
+    def _sign_request(client, method, url):
+        """OAuth headers for a request with an XML body.
+
+        The client's own auth signs such requests the same way but sends
+        them with an empty body, it only keeps form-encoded ones.
+        """
+        client_auth = copy.copy(client.auth)
+        client_auth.realm = url
+        url, headers, body = client_auth.prepare(method, url, {}, b"")
+        return headers
+
+    def _async_client(self):
+        kwargs = {}
+        if self.cassette is not None:
+            kwargs["transport"] = CassetteTransport(self.cassette)
+        return AsyncOAuth1Client(
+            client_id=self.config["app_token"],
+            client_secret=self.config["app_secret"],
+            token=self.config["access_token"],
+            token_secret=self.config["access_token_secret"],
+            timeout=self.config["cardmarket_request_timeout"],
+            **kwargs,
+        )
 
-        self.logger.debug(">> Updating stock")
-        chunked_list = list(self.__chunks(clean_payload, 100))
-        index = 0
-        r = None
-        for chunk in chunked_list:
-            index += 1
-            self.logger.debug(f"chunk {index}/{len(chunked_list)}")
+    async def write_stock(self, method, payload, provided_oauth=None, client=None):
+        """PUT/POST/DELETE stock in chunks of 100 articles, sent concurrently.
+
+        The chunks share the adaptive concurrency limit of get_items, so
+        writes back off on 429s and server errors too. The responses of all chunks are aggregated into one result in the
+        API's own format (updatedArticles/notUpdatedArticles, inserted or
+        deleted). Articles the API rejects are reported as failed straight
+        away, sending them again would only be rejected again. A PUT chunk
+        that fails as a whole on a connection error, timeout or server error
+        is re-sent up to api_write_retries times. POST and DELETE chunks are
+        never re-sent, as they are not idempotent.
+        Pass a long-lived `client` to reuse its connections.
+        """
+        payload = self._clean_stock_payload(method, payload)
+        if client is None:
+            async with self._async_client() as client:
+                result = await self.__write_stock(
+                    method, payload, provided_oauth, client
+                )
+        else:
+            result = await self.__write_stock(method, payload, provided_oauth, client)
+        self._log_stock_write_result(method, result)
+        return result
+
+    async def __write_stock(self, method, payload, provided_oauth, client):
+        url = f"{self.base_url}/stock"
+        rounds = self.config.get("api_write_retries", 1) + 1
+        result = {key: [] for key in set(self.STOCK_WRITE_RESULT_KEYS[method])}
+
+        async def send_chunk(chunk):
             xml_payload = PyMkmHelper.dicttoxml(chunk)
-            r = mkm_oauth.put(
-                url, data=xml_payload, timeout=self.config["cardmarket_request_timeout"]
-            )
-            mkm_oauth.close()
+            if provided_oauth is None:
+                # Wait for the token bucket first, so pacing doesn't count as latency
+                if not await self.scheduler.acquire_async():
+                    raise QuotaExceededError("Request quota depleted. :(", url=url)
+            # Writes share the adaptive concurrency limit with the item batches
+            limiter_started = await self.limiter.acquire()
+            overloaded = True
             try:
-                json_response = self.__get_json(r)
-                if len(json_response["updatedArticles"]) > 0:
-                    for success in json_response["updatedArticles"]:
-                        self.logger.debug(
-                            f"Updated price for aid: {success['idArticle']}, pid: {success['idProduct']}, {success['product']['enName']})."
-                        )
-                if len(json_response["notUpdatedArticles"]) > 0:
-                    for failure in json_response["notUpdatedArticles"]:
-                        self.logger.warning(
-                            f"Failed update price for aid: {failure['tried']['idArticle']})."
+                if provided_oauth is not None:
+                    loop = asyncio.get_running_loop()
+                    r = await loop.run_in_executor(
+                        None,
+                        functools.partial(
+                            self.__send,
+                            provided_oauth,
+                            method,
+                            url,
+                            data=xml_payload,
+                            timeout=self.config["cardmarket_request_timeout"],
+                        ),
+                    )
+                else:
+                    started = time.perf_counter()
+                    try:
+                        r = await client.request(
+                            method.upper(),
+                            url,
+                            content=xml_payload,
+                            headers=self._sign_request(client, method.upper(), url),
+                            auth=None,
                         )
-                        print(failure)
-                        # TODO: remove this when stable. update config to log level WARNING as default
-            except Exception as err:
-                self.logger.error(err)
-
-        # TODO: Only considers the last response.
-        if self.__handle_response(r):
-            return self.__get_json(r)
+                    except Exception:
+                        self._record_request(url, started, None, xml_payload)
+                        raise
+                    self._record_request(url, started, r, xml_payload)
+                    self._read_request_limits_from_header(r)
+                overloaded = (
+                    r.status_code == requests.codes.too_many_requests
+                    or r.status_code >= 500
+                )
+                return r
+            except QuotaExceededError:
+                overloaded = None
+                raise
+            finally:
+                self.limiter.release(limiter_started, overloaded)
 
-    def delete_stock(self, payload=None, provided_oauth=None):
-        ## https://api.cardmarket.com/ws/documentation/API_2.0:Stock_Management
-        url = f"{self.base_url}/stock"
+        queue = list(payload)
+        for round_number in range(rounds):
+            chunks = list(self._chunks(queue, 100))
+            responses = await asyncio.gather(
+                *[send_chunk(chunk) for chunk in chunks], return_exceptions=True
+            )
+            last_round = round_number == rounds - 1
+            queue = []
+            for chunk, r in zip(chunks, responses):
+                successes, failures = self._split_stock_write_response(method, chunk, r)
+                for key, entries in successes.items():
+                    result[key].extend(entries)
+                for article, failure_key, failure in failures:
+                    if last_round or article is None:
+                        result[failure_key].append(failure)
+                    else:
+                        queue.append(article)
+            if not queue:
+                break
+            self.logger.warning(f"Re-queueing {len(queue)} failed stock articles")
+            self.metrics.record_retry(url, len(queue))
+
+        return result
+
+    def _split_stock_write_response(self, method, chunk, response):
+        """Split a chunk's response into successful entries and failed articles.
+
+        Returns ({result key: entries}, [(article, result key, failure entry)]),
+        article is None for failures that must not be sent again.
+        """
+        success_key, failure_key = self.STOCK_WRITE_RESULT_KEYS[method]
+
+        def failure_entry(article, reason):
+            if method == "delete":
+                return {
+                    "success": False,
+                    "idArticle": article.get("idArticle"),
+                    "count": article.get("count"),
+                    "message": reason,
+                }
+            return {"success": False, "tried": article, "error": reason}
+
+        def chunk_failed(reason, transient=False):
+            # Only transient failures of a whole chunk may succeed when sent
+            # again, and as the chunk may have reached the server only PUT is
+            # safe to send again. POST and DELETE articles are never re-queued.
+            retry = transient and method == "put"
+            return {}, [
+                (a if retry else None, failure_key, failure_entry(a, reason))
+                for a in chunk
+            ]
+
+        if isinstance(response, Exception):
+            return chunk_failed(f"{type(response).__name__}: {response}", True)
+        if response.status_code == requests.codes.too_many_requests:
+            self.scheduler.mark_depleted()
+        if response.status_code not in (
+            requests.codes.ok,
+            requests.codes.partial_content,
+        ):
+            return chunk_failed(
+                f"HTTP {response.status_code}", response.status_code >= 500
+            )
 
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
+        json_response = self._get_json(response)
+        if not isinstance(json_response, dict):
+            return chunk_failed("unexpected response")
+        if "error" in json_response:
+            return chunk_failed(json_response["error"])
 
-        self.logger.debug(">> Deleting stock")
-        chunked_list = list(self.__chunks(payload, 100))
-        r = None
-        for chunk in chunked_list:
-            xml_payload = PyMkmHelper.dicttoxml(chunk)
-            r = mkm_oauth.delete(url, data=xml_payload)
+        # Articles the API rejected would be rejected again, they are reported
+        if method == "put":
+            failures = [
+                (None, failure_key, x)
+                for x in json_response.get("notUpdatedArticles", [])
+            ]
+            return {success_key: json_response.get(success_key, [])}, failures
 
-        # TODO: Only considers the last response.
-        if self.__handle_response(r):
-            return self.__get_json(r)
+        entries = json_response.get(success_key, [])
+        failures = [(None, failure_key, x) for x in entries if not x["success"]]
+        return {success_key: [x for x in entries if x["success"]]}, failures
 
     def get_articles(self, product_id, start=0, provided_oauth=None, **kwargs):
+        return list(
+            self.iter_articles(
+                product_id, start=start, provided_oauth=provided_oauth, **kwargs
+            )
+        )
+
+    def iter_articles(self, product_id, start=0, provided_oauth=None, **kwargs):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Articles
         url = f"{self.base_url}/articles/{product_id}"
-        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
         self.logger.debug(f"-> get_articles product_id={product_id} start={start}")
 
-        return self.handle_partial_content(
-            "article", url, provided_oauth=provided_oauth, **kwargs
+        yield from self.__iter_items(
+            self.iter_partial_content_pages(
+                "article", url, start, provided_oauth=provided_oauth, **kwargs
+            )
         )
 
     def get_stock_file(
@@ -547,6 +1102,13 @@ class PyMkmApi:
         provided_oauth=None,
         **kwargs,
     ):
+        return list(self.iter_stock_file(provided_oauth=provided_oauth, **kwargs))
+
+    def iter_stock_file(self, provided_oauth=None, **kwargs):
+        """Rows of the stock file, decoded and parsed while they are downloaded.
+
+        Neither the response nor the file is held in memory whole.
+        """
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Stock_Management
         self.logger.debug(f"-> get_stock_file")
         url = f"{self.base_url}/stock/file"
@@ -557,49 +1119,225 @@ class PyMkmApi:
         query_params = {}
         if "query_params" in kwargs:
             query_params = kwargs["query_params"]
-        r = self.mkm_request(mkm_oauth, url, params=query_params).json()
+        r = self.mkm_request(mkm_oauth, url, params=query_params, stream=True)
+        if r is None:
+            return
+        try:
+            encoded_chunks = self._iter_json_string(r.iter_content(1 << 16), "stock")
+            yield from self._iter_stock_rows(self._iter_decoded_chunks(encoded_chunks))
+        finally:
+            r.close()
+
+    def _iter_stock_file(self, encoded_data):
+        """Stream the base64 encoded, gzipped stock file into rows."""
+        if not encoded_data:
+            return
+        yield from self._iter_stock_rows(self._iter_decoded_file(encoded_data))
+
+    def _iter_stock_rows(self, decoded_chunks):
+        """Rows of the stock file from its decompressed chunks.
+
+        Only a chunk of the file is decoded at a time. Also written to
+        stock_csv_filename, if configured.
+        """
+        lines = self._iter_lines(decoded_chunks)
+        stock_csv_filename = self.config.get("stock_csv_filename")
+        if stock_csv_filename:
+            with open(stock_csv_filename, "w", newline="", encoding="utf-8") as f:
+                yield from self._iter_stock_csv(self.__tee(lines, f))
+        else:
+            yield from self._iter_stock_csv(lines)
+
+    def _iter_stock_csv(self, lines):
+        """Rows of the ;-separated stock file as dicts keyed by its columns."""
+        lines = iter(lines)
+        header = next(csv.reader(lines, delimiter=";"), None)
+        if header is None:
+            return
+        fieldnames = self.stock_csv_fieldnames
+        if header != fieldnames:
+            self.logger.warning(f"Unexpected stock file columns: {header}")
+            fieldnames = header
+        yield from csv.DictReader(lines, fieldnames=fieldnames, delimiter=";")
 
-        encoded_data = r["stock"]
-        if encoded_data:
-            decompressed_data = zlib.decompress(
-                base64.b64decode(encoded_data), 16 + zlib.MAX_WBITS
-            )
-            decoded_data = codecs.decode(decompressed_data, "unicode_escape")
+    @staticmethod
+    def __tee(lines, f):
+        for line in lines:
+            f.write(line)
+            yield line
+
+    @classmethod
+    def _iter_decoded_file(cls, encoded_data, chunk_size=1 << 16):
+        """Decompressed chunks of a base64 encoded, gzipped file."""
+        if isinstance(encoded_data, str):
+            encoded_data = encoded_data.encode("ascii")
+        return cls._iter_decoded_chunks(
+            encoded_data[start : start + chunk_size]
+            for start in range(0, len(encoded_data), chunk_size)
+        )
+
+    @staticmethod
+    def _iter_decoded_chunks(encoded_chunks):
+        """Decompressed chunks of a base64 encoded, gzipped file read in chunks."""
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        pending = b""
+        for chunk in encoded_chunks:
+            pending += chunk
+            # base64 decodes in independent blocks of 4 characters
+            usable = len(pending) - len(pending) % 4
+            yield decompressor.decompress(base64.b64decode(pending[:usable]))
+            pending = pending[usable:]
+        yield decompressor.decompress(base64.b64decode(pending))
+        yield decompressor.flush()
+
+    @classmethod
+    def _iter_json_string(cls, chunks, key):
+        """Chunks of the string value of `key` in a JSON object read in chunks.
+
+        For long values without \\u escapes, like the base64 encoded files,
+        so the response never has to be held in memory whole.
+        """
+        start = re.compile(rb'"%s"\s*:\s*"' % re.escape(key.encode()))
+        token = re.compile(rb'\\(.)|"', re.S)
+        chunks = iter(chunks)
+        pending = b""
+        for chunk in chunks:
+            pending += chunk
+            found = start.search(pending)
+            if found:
+                pending = pending[found.end() :]
+                break
+            # keep enough to find the key split across chunks
+            pending = pending[-64:]
+        else:
+            return
+        value_start, pending = pending, b""
+        for chunk in itertools.chain([value_start], chunks):
+            chunk = pending + chunk
+            # a trailing backslash escapes the first byte of the next chunk
+            backslashes = len(chunk) - len(chunk.rstrip(b"\\"))
+            pending = b"\\" if backslashes % 2 else b""
+            chunk = chunk[: len(chunk) - len(pending)]
+            parts = []
+            position = 0
+            for match in token.finditer(chunk):
+                parts.append(chunk[position : match.start()])
+                if match.group(1) is None:
+                    yield b"".join(parts)
+                    return
+                parts.append(cls.JSON_ESCAPES[match.group(1)])
+                position = match.end()
+            parts.append(chunk[position:])
+            yield b"".join(parts)
+
+    @staticmethod
+    def _iter_lines(chunks, encoding="unicode_escape"):
+        """Text lines (split on \\n only, like the csv module expects) of byte chunks.
+
+        Lines are split as bytes and each is decoded whole: an escape split
+        across chunks can't be decoded incrementally on every Python version.
+        """
+        pending = b""
+        for chunk in chunks:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line.decode(encoding) + "\n"
+        if pending:
+            yield pending.decode(encoding)
+
+    @staticmethod
+    def _decode_file(encoded_data):
+        """Decode the base64 encoded, gzipped files the API returns."""
+        return zlib.decompress(base64.b64decode(encoded_data), 16 + zlib.MAX_WBITS)
 
-            return_dict = []
-            if decoded_data:
-                has_header = csv.Sniffer().has_header(decoded_data)
-                dialect = csv.Sniffer().sniff(decoded_data)
+    def get_price_guide_file(self, game_id=1, provided_oauth=None):
+        ## https://api.cardmarket.com/ws/documentation/API_2.0:PriceGuide
+        url = f"{self.base_url}/priceguide"
+        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
-                with open("stock.csv", "w", newline="", encoding="utf-8") as f:
-                    f.write(decoded_data)
+        self.logger.debug(f">> Getting price guide file for game id {game_id}")
+        r = self.mkm_request(mkm_oauth, url, params={"idGame": game_id})
 
-                reader = None
-                with open("stock.csv", "r") as f:
-                    reader = csv.DictReader(f, dialect=dialect)
-                    for row in reader:
-                        return_dict.append(row)
+        if r:
+            encoded_data = self._get_json(r)["priceguidefile"]
+            return PyMkmPriceGuide.read_csv(self._decode_file(encoded_data))
 
-                if reader is None:
-                    self.logger.error("Error getting stock as CSV.")
+    def get_product_list_file(self, provided_oauth=None):
+        ## https://api.cardmarket.com/ws/documentation/API_2.0:ProductList
+        url = f"{self.base_url}/productlist"
+        mkm_oauth = self.__setup_auth_session(url, provided_oauth)
 
-            return return_dict
+        self.logger.debug(">> Getting product list file")
+        r = self.mkm_request(mkm_oauth, url)
+
+        if r:
+            encoded_data = self._get_json(r)["productsfile"]
+            return PyMkmPriceGuide.read_csv(self._decode_file(encoded_data))
+
+    def get_price_guide(self, game_id=1, provided_oauth=None):
+        """Price guide for all products of a game, costs two API calls.
+
+        Reads price_guide_filename (and product_list_filename) instead of
+        downloading the files when they are configured.
+        """
+        price_guide_filename = self.config.get("price_guide_filename")
+        if price_guide_filename:
+            self.logger.debug(f">> Reading price guide from {price_guide_filename}")
+            return PyMkmPriceGuide.from_files(
+                price_guide_filename, self.config.get("product_list_filename")
+            )
+        return PyMkmPriceGuide(
+            self.get_price_guide_file(game_id, provided_oauth) or [],
+            self.get_product_list_file(provided_oauth),
+        )
 
     def get_stock(self, start=1, provided_oauth=None, **kwargs):
+        return list(self.iter_stock(start, provided_oauth=provided_oauth, **kwargs))
+
+    def iter_stock(self, start=1, provided_oauth=None, **kwargs):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Stock_Management
         self.logger.debug(f"-> get_stock start={start}")
         url = f"{self.base_url}/stock"
 
-        return self.handle_partial_content(
-            "article",
+        yield from self.__iter_items(
+            self.iter_partial_content_pages(
+                "article",
+                url,
+                start,
+                avoid_redirect=True,
+                provided_oauth=provided_oauth,
+                **kwargs,
+            )
+        )
+
+    def handle_partial_content(
+        self,
+        item_name,
+        url,
+        start=0,
+        avoid_redirect=False,
+        provided_oauth=None,
+        **kwargs,
+    ):
+        pages = self.iter_partial_content_pages(
+            item_name,
             url,
             start,
-            avoid_redirect=True,
+            avoid_redirect=avoid_redirect,
             provided_oauth=provided_oauth,
             **kwargs,
         )
+        items = None
+        for page in pages:
+            if items is None:
+                # A single (200) page is returned as is, it is not always a list
+                items = page
+            else:
+                items.extend(page)
+        return items
 
-    def handle_partial_content(
+    def iter_partial_content_pages(
         self,
         item_name,
         url,
@@ -608,54 +1346,118 @@ class PyMkmApi:
         provided_oauth=None,
         **kwargs,
     ):
+        """Yield the pages of a (possibly) paginated listing in order, as they arrive."""
         INCREMENT = 100
-        params = kwargs.copy()
-        params.update({"start": start, "maxResults": INCREMENT})
 
-        if avoid_redirect:
-            tmp_url = f"{url}/{start}"
-        else:
-            tmp_url = url
+        def fetch_page(page_start):
+            return self.__get_partial_content_page(
+                url, page_start, INCREMENT, avoid_redirect, provided_oauth, **kwargs
+            )
 
-        mkm_oauth = self.__setup_auth_session(tmp_url, provided_oauth)
-        r = self.mkm_request(mkm_oauth, tmp_url, params=params)
+        r = fetch_page(start)
 
         max_items = 0
         if r:
             if r.status_code == requests.codes.partial_content:
-                max_items = self.__get_max_items_from_header(r)
+                max_items = self._get_max_items_from_header(r)
                 self.logger.debug(
                     f"> Content-Range header: {r.headers['Content-Range']}"
                 )
+                first_page = self._get_json(r, item_ref=item_name)
                 self.logger.debug(
-                    f"> # {item_name}s in response: {str(len(self.__get_json(r, item_ref=item_name)))}"
+                    f"> # {item_name}s in response: {str(len(first_page))}"
                 )
-                next_start = start + INCREMENT
-                if next_start >= max_items and self.__handle_response(r):
-                    return self.__get_json(r, item_ref=item_name)
-                else:
+                yield first_page
+
+                remaining_starts = range(start + INCREMENT, max_items, INCREMENT)
+                if remaining_starts:
                     self.logger.debug(
-                        f"-> get {item_name}s recurring to next_start={next_start}"
+                        f"-> get {item_name}s fetching {len(remaining_starts)} more pages"
                     )
-                    # item_name,url,start=0,avoid_redirect=False,provided_oauth=None,**kwargs,
-                    return self.__get_json(r, item_ref=item_name) + self.handle_partial_content(
-                        item_name,
-                        url,
-                        # mkm_oauth,
-                        next_start,
-                        avoid_redirect=avoid_redirect,
-                        provided_oauth=provided_oauth,
-                        **kwargs,
+                    yield from self.__iter_pages(
+                        item_name, url, remaining_starts, INCREMENT, fetch_page
                     )
             elif r.status_code == requests.codes.no_content:
                 raise CardmarketError(f"No {item_name}s found.")
-                return False
             elif r.status_code == requests.codes.ok:
-                return self.__get_json(r, item_ref=item_name)
+                yield self._get_json(r, item_ref=item_name)
             else:
                 raise ConnectionError(r)
+
+    def __iter_items(self, pages):
+        for page in pages:
+            if isinstance(page, list):
+                yield from page
+            elif page is not None:
+                yield page
+
+    def __get_partial_content_page(
+        self, url, start, increment, avoid_redirect, provided_oauth, **kwargs
+    ):
+        params = kwargs.copy()
+        params.update({"start": start, "maxResults": increment})
+
+        if avoid_redirect:
+            tmp_url = f"{url}/{start}"
         else:
-            pass
+            tmp_url = url
+
+        mkm_oauth = self.__setup_auth_session(tmp_url, provided_oauth)
+        return self.mkm_request(mkm_oauth, tmp_url, params=params)
+
+    def __iter_pages(self, item_name, url, page_starts, page_size, fetch_page):
+        """Fetch pages concurrently, yielded in the order of page_starts.
+
+        Only a window of pages is in flight at a time, so memory stays
+        constant per page. A failed page is retried on its own, after the
+        same backoff as failed items in get_items. A page that keeps failing
+        raises CardmarketError naming its range, rather than returning a
+        listing with items missing.
+        """
+        max_workers = max(1, self.config.get("api_page_concurrency", 4))
+        retries = self.config.get("api_page_retries", 2)
+
+        def fetch_with_retries(page_start):
+            for attempt in range(retries + 1):
+                r = fetch_page(page_start)
+                reason = f"HTTP {r.status_code}" if r is not None else "no response"
+                if r and r.status_code in (
+                    requests.codes.ok,
+                    requests.codes.partial_content,
+                ):
+                    page = self._get_json(r, item_ref=item_name)
+                    if page is not None:
+                        return page
+                    reason = "unreadable response"
+                if attempt < retries:
+                    delay = self._retry_delay(attempt + 1)
+                    self.logger.warning(
+                        f"Retrying {item_name}s page start={page_start} in {delay:0.2f}s ({attempt + 1}/{retries})"
+                    )
+                    time.sleep(delay)
+                    self.metrics.record_retry(url)
+            last = page_start + page_size - 1
+            raise CardmarketError(
+                f"Failed to get {item_name}s {page_start}-{last} after {retries} retries ({reason}).",
+                url=url,
+            )
+
+        page_starts = iter(page_starts)
+        in_flight = collections.deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for page_start in itertools.islice(page_starts, 2 * max_workers):
+                    in_flight.append(executor.submit(fetch_with_retries, page_start))
+                while in_flight:
+                    page = in_flight.popleft().result()
+                    for page_start in itertools.islice(page_starts, 1):
+                        in_flight.append(
+                            executor.submit(fetch_with_retries, page_start)
+                        )
+                    yield page
+            finally:
+                for future in in_flight:
+                    future.cancel()
 
     def find_product(self, search, provided_oauth=None, **kwargs):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Find_Products
@@ -690,18 +1492,24 @@ class PyMkmApi:
         if r.status_code == requests.codes.no_content:
             raise CardmarketError("No articles found.")
         elif r.status_code == requests.codes.ok:
-            return self.__get_json(r, item_ref="article")
+            return self._get_json(r, item_ref="article")
         else:
             raise ConnectionError(r)
 
     def find_user_articles(self, user_id, provided_oauth=None, **kwargs):
+        return list(
+            self.iter_user_articles(user_id, provided_oauth=provided_oauth, **kwargs)
+        )
+
+    def iter_user_articles(self, user_id, provided_oauth=None, **kwargs):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:User_Articles
-        INCREMENT = 1000
         url = f"{self.base_url}/users/{user_id}/articles"
 
         self.logger.debug(">> Getting articles from user: " + str(user_id))
-        return self.handle_partial_content(
-            "article", url, provided_oauth=provided_oauth, **kwargs
+        yield from self.__iter_items(
+            self.iter_partial_content_pages(
+                "article", url, provided_oauth=provided_oauth, **kwargs
+            )
         )
 
     def get_wantslists(self, provided_oauth=None, **kwargs):
@@ -713,7 +1521,7 @@ class PyMkmApi:
         self.logger.debug(">> Getting all wants lists")
 
         r = self.mkm_request(mkm_oauth, url)
-        return self.__get_json(r, item_ref="wantslist")
+        return self._get_json(r, item_ref="wantslist")
 
     def get_wantslist_items(self, idWantsList, provided_oauth=None, **kwargs):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Wantslist_Item
@@ -724,9 +1532,16 @@ class PyMkmApi:
         self.logger.debug(">> Getting wants list items")
 
         r = self.mkm_request(mkm_oauth, url)
-        return self.__get_json(r, item_ref="wantslist")
+        return self._get_json(r, item_ref="wantslist")
 
     def get_orders(self, actor, state, start=0, provided_oauth=None, **kwargs):
+        return list(
+            self.iter_orders(
+                actor, state, start, provided_oauth=provided_oauth, **kwargs
+            )
+        )
+
+    def iter_orders(self, actor, state, start=0, provided_oauth=None, **kwargs):
         ## https://api.cardmarket.com/ws/documentation/API_2.0:Filter_Orders
         url = f"{self.base_url}/orders/{actor}/{state}"
         if start:
@@ -734,6 +1549,8 @@ class PyMkmApi:
 
         self.logger.debug(f"-> get_orders start={start}")
 
-        return self.handle_partial_content(
-            "order", url, start, provided_oauth=provided_oauth, **kwargs
+        yield from self.__iter_items(
+            self.iter_partial_content_pages(
+                "order", url, start, provided_oauth=provided_oauth, **kwargs
+            )
         )
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Async counterpart of PyMkmApi, for services running their own event loop.
+"""
+
+__author__ = "Andreas Ehrlund"
+__version__ = "2.5.1"
+__license__ = "MIT"
+
+import asyncio
+import collections
+import copy
+import itertools
+import time
+import urllib.parse
+
+import requests
+from requests import ConnectionError
+
+from pymkm.pymkm_priceguide import PyMkmPriceGuide
+from pymkm.pymkmapi import CardmarketError, PyMkmApi, QuotaExceededError
+
+
+class AsyncPyMkmApi:
+    """Every PyMkmApi endpoint as a coroutine, on one long-lived httpx client.
+
+    Use it as an async context manager (or call open() and aclose()), the
+    client is created lazily otherwise. Config, logger, request scheduler
+    and response cache are shared with the wrapped PyMkmApi, so sync and
+    async calls count against the same quota. A PyMkmApi created here is
+    closed by aclose(), one passed in as `api` is left to its owner.
+
+        async with AsyncPyMkmApi(config) as api:
+            account, stock = await asyncio.gather(api.get_account(), api.get_stock())
+    """
+
+    def __init__(self, config=None, logger=None, api=None):
+        self.owns_api = api is None
+        self.api = api if api is not None else PyMkmApi(config, logger)
+        self.config = self.api.config
+        self.logger = self.api.logger
+        self.base_url = self.api.base_url
+        self.scheduler = self.api.scheduler
+        self.cache = self.api.cache
+        self.client = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def open(self):
+        if self.client is None:
+            self.client = self.api._async_client()
+            await self.client.__aenter__()
+        return self
+
+    async def aclose(self):
+        if self.client is not None:
+            client, self.client = self.client, None
+            await client.__aexit__(None, None, None)
+        if self.owns_api:
+            # Saves the cassette, writes the metrics and closes the cache
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.api.close)
+
+    async def _get_client(self):
+        if self.client is None:
+            await self.open()
+        return self.client
+
+    def reserve_quota(self, estimated_calls, job_name="job"):
+        return self.api.reserve_quota(estimated_calls, job_name)
+
+    async def request(self, method, url, params=None, content=None):
+        """Send one signed request through the scheduler, no error handling."""
+        client = await self._get_client()
+        if not await self.scheduler.acquire_async():
+            raise QuotaExceededError("Request quota depleted. :(", url=url)
+        if content is None:
+            client_auth = copy.copy(client.auth)
+            client_auth.realm = url
+            headers = None
+        else:
+            client_auth = None
+            headers = self.api._sign_request(client, method.upper(), url)
+        started = time.perf_counter()
+        try:
+            r = await client.request(
+                method.upper(),
+                url,
+                params=params,
+                content=content,
+                headers=headers,
+                auth=client_auth,
+            )
+        except Exception:
+            self.api._record_request(url, started, None, content)
+            raise
+        self.api._record_request(url, started, r, content)
+        self.api._read_request_limits_from_header(r)
+        return r
+
+    async def mkm_request(self, url, params=None):
+        try:
+            r = await self.request("GET", url, params=params)
+            self.api._handle_response(r)
+            return r
+        except CardmarketError as err:
+            self.logger.error(f"{err.mkm_msg()} {url}")
+        except Exception as err:
+            print(f"\n>> Cardmarket connection error: {err} for {url}")
+            self.logger.error(f"{err} for {url}")
+
+    async def __get(self, url, params=None, item_ref=None):
+        r = await self.mkm_request(url, params=params)
+        if r:
+            return self.api._get_json(r, item_ref=item_ref)
+
+    async def __get_cacheable(self, resource, item_id, url, use_cache):
+        if use_cache:
+            cached = self.cache.get(resource, item_id)
+            if cached is not None:
+                self.logger.debug(f">> Cache hit for {resource} {item_id}")
+                return cached
+
+        r = await self.mkm_request(url)
+        if r:
+            json_data = self.api._get_json(r)
+            if r.status_code == requests.codes.ok and json_data is not None:
+                self.cache.put(resource, item_id, json_data)
+            return json_data
+
+    async def get_games(self, use_cache=True):
+        self.logger.debug(">> Getting all games")
+        return await self.__get_cacheable(
+            "games", "all", f"{self.base_url}/games", use_cache
+        )
+
+    async def get_expansions(self, game_id, use_cache=True):
+        self.logger.debug(f">> Getting all expansions for game id {game_id}")
+        return await self.__get_cacheable(
+            "expansions",
+            game_id,
+            f"{self.base_url}/games/{game_id}/expansions",
+            use_cache,
+        )
+
+    async def get_cards_in_expansion(self, expansion_id):
+        self.logger.debug(f">> Getting all cards for expansion id: {expansion_id}")
+        return await self.__get(f"{self.base_url}/expansions/{expansion_id}/singles")
+
+    async def get_product(self, product_id, use_cache=True):
+        self.logger.debug(f">> Getting data for product id {product_id}")
+        return await self.__get_cacheable(
+            "products", product_id, f"{self.base_url}/products/{product_id}", use_cache
+        )
+
+    async def get_metaproduct(self, metaproduct_id, use_cache=True):
+        self.logger.debug(f">> Getting data for metaproduct id {metaproduct_id}")
+        return await self.__get_cacheable(
+            "metaproducts",
+            metaproduct_id,
+            f"{self.base_url}/metaproducts/{metaproduct_id}",
+            use_cache,
+        )
+
+    async def get_items(
+        self, item_type, item_id_list, progressbar=None, use_cache=True, as_dict=False
+    ):
+        return await self.api.get_items(
+            item_type,
+            item_id_list,
+            progressbar,
+            use_cache,
+            client=await self._get_client(),
+            as_dict=as_dict,
+        )
+
+    async def get_account(self):
+        self.logger.debug(">> Getting account details")
+        return await self.__get(f"{self.base_url}/account")
+
+    async def get_articles_in_shoppingcarts(self):
+        self.logger.debug(">> Getting articles in other users' shopping carts")
+        return await self.__get(f"{self.base_url}/stock/shoppingcart-articles")
+
+    async def set_vacation_status(self, vacation_status=False):
+        url = f"{self.base_url}/account/vacation"
+        self.logger.debug(f">> Setting vacation status to: {vacation_status}")
+        r = await self.request(
+            "PUT", url, params={"onVacation": str(vacation_status).lower()}
+        )
+        if self.api._handle_response(r):
+            return self.api._get_json(r)
+
+    async def set_display_language(self, display_language=1):
+        url = f"{self.base_url}/account/language"
+        self.logger.debug(f">> Setting display language to: {display_language}")
+        r = await self.request(
+            "PUT", url, params={"idDisplayLanguage": display_language}
+        )
+        if self.api._handle_response(r):
+            return self.api._get_json(r)
+
+    async def add_stock(self, payload=None):
+        self.logger.debug(">> Adding stock")
+        return await self.write_stock("post", payload)
+
+    async def set_stock(self, payload=None):
+        self.logger.debug(">> Updating stock")
+        return await self.write_stock("put", payload)
+
+    async def delete_stock(self, payload=None):
+        self.logger.debug(">> Deleting stock")
+        return await self.write_stock("delete", payload)
+
+    async def write_stock(self, method, payload):
+        return await self.api.write_stock(
+            method, payload, client=await self._get_client()
+        )
+
+    async def get_stock_file(self, **kwargs):
+        return [x async for x in self.iter_stock_file(**kwargs)]
+
+    async def iter_stock_file(self, **kwargs):
+        self.logger.debug(">> Getting stock as gzip")
+        json_data = await self.__get(
+            f"{self.base_url}/stock/file", params=kwargs.get("query_params", {})
+        )
+        if json_data:
+            for row in self.api._iter_stock_file(json_data["stock"]):
+                yield row
+
+    async def get_price_guide_file(self, game_id=1):
+        self.logger.debug(f">> Getting price guide file for game id {game_id}")
+        json_data = await self.__get(
+            f"{self.base_url}/priceguide", params={"idGame": game_id}
+        )
+        if json_data:
+            return PyMkmPriceGuide.read_csv(
+                self.api._decode_file(json_data["priceguidefile"])
+            )
+
+    async def get_product_list_file(self):
+        self.logger.debug(">> Getting product list file")
+        json_data = await self.__get(f"{self.base_url}/productlist")
+        if json_data:
+            return PyMkmPriceGuide.read_csv(
+                self.api._decode_file(json_data["productsfile"])
+            )
+
+    async def get_price_guide(self, game_id=1):
+        if self.config.get("price_guide_filename"):
+            return self.api.get_price_guide(game_id)
+        price_guide_rows, product_list_rows = await asyncio.gather(
+            self.get_price_guide_file(game_id), self.get_product_list_file()
+        )
+        return PyMkmPriceGuide(price_guide_rows or [], product_list_rows)
+
+    async def get_stock(self, start=1, **kwargs):
+        return [x async for x in self.iter_stock(start, **kwargs)]
+
+    async def iter_stock(self, start=1, **kwargs):
+        self.logger.debug(f"-> get_stock start={start}")
+        async for item in self.__iter_items(
+            self.iter_partial_content_pages(
+                "article",
+                f"{self.base_url}/stock",
+                start,
+                avoid_redirect=True,
+                **kwargs,
+            )
+        ):
+            yield item
+
+    async def get_articles(self, product_id, start=0, **kwargs):
+        return [x async for x in self.iter_articles(product_id, start, **kwargs)]
+
+    async def iter_articles(self, product_id, start=0, **kwargs):
+        self.logger.debug(f"-> get_articles product_id={product_id} start={start}")
+        async for item in self.__iter_items(
+            self.iter_partial_content_pages(
+                "article", f"{self.base_url}/articles/{product_id}", start, **kwargs
+            )
+        ):
+            yield item
+
+    async def find_product(self, search, **kwargs):
+        self.logger.debug(f">> Finding product for search string: {search}")
+        if "search" not in kwargs:
+            kwargs["search"] = search
+        if len(search) < 4:
+            kwargs["exact"] = "true"
+        return await self.handle_partial_content(
+            "product", f"{self.base_url}/products/find", **kwargs
+        )
+
+    async def find_stock_article(self, name, game_id):
+        url = f"{self.base_url}/stock/articles/{urllib.parse.quote(name)}/{game_id}"
+        self.logger.debug(f">> Finding articles in stock: {name}")
+
+        r = await self.mkm_request(url)
+        if r.status_code == requests.codes.no_content:
+            raise CardmarketError("No articles found.")
+        elif r.status_code == requests.codes.ok:
+            return self.api._get_json(r, item_ref="article")
+        else:
+            raise ConnectionError(r)
+
+    async def find_user_articles(self, user_id, **kwargs):
+        return [x async for x in self.iter_user_articles(user_id, **kwargs)]
+
+    async def iter_user_articles(self, user_id, **kwargs):
+        self.logger.debug(f">> Getting articles from user: {user_id}")
+        async for item in self.__iter_items(
+            self.iter_partial_content_pages(
+                "article", f"{self.base_url}/users/{user_id}/articles", **kwargs
+            )
+        ):
+            yield item
+
+    async def get_wantslists(self):
+        self.logger.debug(">> Getting all wants lists")
+        return await self.__get(f"{self.base_url}/wantslist", item_ref="wantslist")
+
+    async def get_wantslist_items(self, idWantsList):
+        self.logger.debug(">> Getting wants list items")
+        return await self.__get(
+            f"{self.base_url}/wantslist/{idWantsList}", item_ref="wantslist"
+        )
+
+    async def get_orders(self, actor, state, start=0, **kwargs):
+        return [x async for x in self.iter_orders(actor, state, start, **kwargs)]
+
+    async def iter_orders(self, actor, state, start=0, **kwargs):
+        url = f"{self.base_url}/orders/{actor}/{state}"
+        if start:
+            url += f"/{start}"
+        self.logger.debug(f"-> get_orders start={start}")
+        async for item in self.__iter_items(
+            self.iter_partial_content_pages("order", url, start, **kwargs)
+        ):
+            yield item
+
+    async def handle_partial_content(
+        self, item_name, url, start=0, avoid_redirect=False, **kwargs
+    ):
+        items = None
+        async for page in self.iter_partial_content_pages(
+            item_name, url, start, avoid_redirect=avoid_redirect, **kwargs
+        ):
+            if items is None:
+                # A single (200) page is returned as is, it is not always a list
+                items = page
+            else:
+                items.extend(page)
+        return items
+
+    async def iter_partial_content_pages(
+        self, item_name, url, start=0, avoid_redirect=False, **kwargs
+    ):
+        """Yield the pages of a (possibly) paginated listing in order, as they arrive."""
+        INCREMENT = 100
+
+        def fetch_page(page_start):
+            params = kwargs.copy()
+            params.update({"start": page_start, "maxResults": INCREMENT})
+            page_url = f"{url}/{page_start}" if avoid_redirect else url
+            return self.mkm_request(page_url, params=params)
+
+        r = await fetch_page(start)
+        if r:
+            if r.status_code == requests.codes.partial_content:
+                max_items = self.api._get_max_items_from_header(r)
+                yield self.api._get_json(r, item_ref=item_name)
+
+                remaining_starts = range(start + INCREMENT, max_items, INCREMENT)
+                async for page in self.__iter_pages(
+                    item_name, url, remaining_starts, INCREMENT, fetch_page
+                ):
+                    yield page
+            elif r.status_code == requests.codes.no_content:
+                raise CardmarketError(f"No {item_name}s found.")
+            elif r.status_code == requests.codes.ok:
+                yield self.api._get_json(r, item_ref=item_name)
+            else:
+                raise ConnectionError(r)
+
+    async def __iter_items(self, pages):
+        async for page in pages:
+            if isinstance(page, list):
+                for item in page:
+                    yield item
+            elif page is not None:
+                yield page
+
+    async def __iter_pages(self, item_name, url, page_starts, page_size, fetch_page):
+        """Fetch pages concurrently, yielded in the order of page_starts.
+
+        Same windowing, per-page retries with backoff and errors as PyMkmApi,
+        on tasks instead of threads.
+        """
+        concurrency = max(1, self.config.get("api_page_concurrency", 4))
+        retries = self.config.get("api_page_retries", 2)
+        sem = asyncio.Semaphore(concurrency)
+
+        async def fetch_with_retries(page_start):
+            for attempt in range(retries + 1):
+                async with sem:
+                    r = await fetch_page(page_start)
+                reason = f"HTTP {r.status_code}" if r is not None else "no response"
+                if r and r.status_code in (
+                    requests.codes.ok,
+                    requests.codes.partial_content,
+                ):
+                    page = self.api._get_json(r, item_ref=item_name)
+                    if page is not None:
+                        return page
+                    reason = "unreadable response"
+                if attempt < retries:
+                    delay = self.api._retry_delay(attempt + 1)
+                    self.logger.warning(
+                        f"Retrying {item_name}s page start={page_start} in {delay:0.2f}s ({attempt + 1}/{retries})"
+                    )
+                    await asyncio.sleep(delay)
+                    self.api.metrics.record_retry(url)
+            last = page_start + page_size - 1
+            raise CardmarketError(
+                f"Failed to get {item_name}s {page_start}-{last} after {retries} retries ({reason}).",
+                url=url,
+            )
+
+        page_starts = iter(page_starts)
+        in_flight = collections.deque()
+        try:
+            for page_start in itertools.islice(page_starts, 2 * concurrency):
+                in_flight.append(asyncio.ensure_future(fetch_with_retries(page_start)))
+            while in_flight:
+                page = await in_flight.popleft()
+                for page_start in itertools.islice(page_starts, 1):
+                    in_flight.append(
+                        asyncio.ensure_future(fetch_with_retries(page_start))
+                    )
+                yield page
+        finally:
+            for task in in_flight:
+                task.cancel()
@@ -0,0 +1,41 @@
+"""
+Python unittest
+"""
+
+import unittest
+
+from bench.bench_repricing import STAGES, compare, run_benchmark
+from test.test_common import TestCommon
+
+
+class TestBenchRepricing(TestCommon):
+    def test_measures_every_stage(self):
+        current = run_benchmark([20], num_products=200)
+
+        stages = current["results"]["20"]
+        self.assertEqual(list(stages), STAGES)
+        for values in stages.values():
+            self.assertGreaterEqual(values["seconds"], 0)
+            self.assertGreater(values["peak_memory_bytes"], 0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {"10": {"set_stock": {"seconds": 1.0}}}}
+        current = {
+            "results": {
+                "10": {
+                    "set_stock": {"seconds": 1.5},
+                    "display_price_changes_table": {"seconds": 0.1},
+                }
+            }
+        }
+        rows, regressed = compare(current, baseline, tolerance=0.25)
+        self.assertTrue(regressed)
+        self.assertEqual(rows[0][-1], "REGRESSION")
+        self.assertIsNone(rows[1][2])
+
+        _, regressed = compare(current, baseline, tolerance=1.0)
+        self.assertFalse(regressed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,18 @@
 """
 Python unittest
 """
+import functools
+import inspect
 import io
 import json
 import logging
 import unittest
+from types import SimpleNamespace
 
 from unittest.mock import MagicMock, Mock, mock_open, patch
 
+import httpx
+
 from pymkm.pymkm_app import PyMkmApp
 from pymkm.pymkmapi import PyMkmApi
 
@@ -37,6 +42,47 @@ class MockResponse:
     def json(self):
         return self.json_data
 
+    def iter_content(self, chunk_size=1):
+        body = json.dumps(self.json_data).encode()
+        for start in range(0, len(body), chunk_size):
+            yield body[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeAsyncClient:
+    """Stands in for AsyncOAuth1Client, answering product GETs.
+
+    `handler(product_id)` returns the httpx.Response (or raises), it may be
+    a coroutine function. Without one every product is found. Patch
+    AsyncOAuth1Client with FakeAsyncClient.answering(handler).
+    """
+
+    def __init__(self, handler=None, **kwargs):
+        self.handler = handler or self.found
+        self.auth = SimpleNamespace(realm=None)
+
+    @classmethod
+    def answering(cls, handler):
+        return functools.partial(cls, handler)
+
+    @staticmethod
+    def found(product_id):
+        return httpx.Response(200, json={"product": {"idProduct": product_id}})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def get(self, url, auth=None):
+        response = self.handler(int(url.rsplit("/", 1)[1]))
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
 
 class TestCommon(unittest.TestCase):
     class ArgsObject(object):
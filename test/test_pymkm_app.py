@@ -0,0 +1,180 @@
+"""
+Python unittest
+"""
+
+import csv
+import io
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pymkm.pymkm_app import PyMkmApp
+from pymkm.pymkm_calculators import DefaultPriceCalculator
+from pymkm.pymkm_standin_server import PyMkmStandInCatalog
+from pymkm.pymkmapi import BatchResultDict, PyMkmApi, QuotaExceededError
+from test.test_common import TestCommon
+
+
+class TestPyMkmApp(TestCommon):
+    def test_normalise_stock_rows(self):
+        row = dict.fromkeys(PyMkmApi.stock_csv_fieldnames, "")
+        row.update(
+            {
+                "idArticle": "12",
+                "idProduct": "100",
+                "English Name": "Aether Vial",
+                "Local Name": "Äther-Phiole",
+                "Exp. Name": "Darksteel",
+                "Price": "1.50",
+                "Language": "3",
+                "Condition": "NM",
+                "Foil?": "X",
+                "Amount": "2",
+            }
+        )
+
+        (article,) = PyMkmApp.normalise_stock_rows([row])
+        self.assertEqual(
+            article,
+            {
+                "idArticle": 12,
+                "idProduct": 100,
+                "count": 2,
+                "comments": "",
+                "price": 1.5,
+                "condition": "NM",
+                "isFoil": "X",
+                "isPlayset": "",
+                "isSigned": "",
+                "idLanguage": 3,
+                "product": {
+                    "enName": "Aether Vial",
+                    "locName": "Äther-Phiole",
+                    "expansion": "Darksteel",
+                },
+            },
+        )
+
+    @patch.object(PyMkmApp, "get_price_for_product", return_value=1.5)
+    def test_match_card_and_add_stock_reports_rejected_insert(self, mock_price):
+        app = PyMkmApp.__new__(PyMkmApp)
+        app.logger = MagicMock()
+        app.config = self.config
+        app.api = None
+        api = MagicMock()
+        api.find_product.return_value = [
+            {
+                "idProduct": 100,
+                "categoryName": "Magic Single",
+                "enName": "Aether Vial",
+                "expansionName": "Darksteel",
+                "rarity": "Uncommon",
+            }
+        ]
+        row = {
+            "name": "Aether Vial",
+            "set_name": "Darksteel",
+            "language_name": "",
+            "count": "1",
+            "foil": "",
+        }
+
+        api.add_stock.return_value = {"inserted": [{"success": True}]}
+        self.assertTrue(app.match_card_and_add_stock(api, row))
+
+        api.add_stock.return_value = {
+            "inserted": [{"success": False, "error": "Invalid price"}]
+        }
+        self.assertFalse(app.match_card_and_add_stock(api, row))
+        self.assertIn("Invalid price", app.logger.error.call_args[0][0])
+
+    def test_calculate_new_prices_for_plain_dict_stock(self):
+        app = PyMkmApp.__new__(PyMkmApp)
+        app.logger = MagicMock()
+        app.config = self.config
+        app.config["price_source"] = "products"
+        app.price_calculator = DefaultPriceCalculator
+        stock = [
+            {
+                "idArticle": article_id,
+                "idProduct": 100,
+                "count": 1,
+                "price": price,
+                "condition": "NM",
+                "idLanguage": 1,
+                "product": {"enName": "Aether Vial", "expansion": "Darksteel"},
+            }
+            for article_id, price in ((1, 0.5), (2, 2.0))
+        ]
+        api = MagicMock()
+        api.get_items_async.return_value = BatchResultDict(
+            {
+                100: {
+                    "product": {
+                        "idProduct": 100,
+                        "rarity": None,
+                        "priceGuide": {"TREND": 2.0, "TRENDFOIL": 4.0},
+                    }
+                }
+            }
+        )
+
+        changes, checked, sticky_count = app.calculate_new_prices_for_stock(
+            stock, None, [2], api
+        )
+        self.assertEqual(checked, [1])
+        self.assertEqual([x["idArticle"] for x in changes], [1])
+        self.assertEqual(changes[0]["price"], 2.0)
+
+    def test_quota_is_reserved_for_uncached_products_only(self):
+        app = PyMkmApp.__new__(PyMkmApp)
+        app.logger = MagicMock()
+        app.config = self.config
+        app.config["price_source"] = "products"
+        app.price_calculator = DefaultPriceCalculator
+        stock = [
+            {
+                "idArticle": article_id,
+                "idProduct": product_id,
+                "count": 1,
+                "price": 0.5,
+                "condition": "NM",
+                "idLanguage": 1,
+                "product": {"enName": "Aether Vial", "expansion": "Darksteel"},
+            }
+            for article_id, product_id in ((1, 100), (2, 200), (3, 100))
+        ]
+        product = {
+            "product": {
+                "idProduct": 100,
+                "rarity": None,
+                "priceGuide": {"TREND": 2.0, "TRENDFOIL": 4.0},
+            }
+        }
+        api = MagicMock()
+        api.cache.get_many.return_value = {100: product}
+        api.reserve_quota.side_effect = QuotaExceededError("No quota left.")
+        api.get_items_async.return_value = BatchResultDict({100: product})
+
+        changes, checked, _ = app.calculate_new_prices_for_stock(stock, None, [], api)
+        api.reserve_quota.assert_called_once_with(1, "Price update")
+        # the cached product is still priced, the uncached one is deferred
+        self.assertEqual(api.get_items_async.call_args[0][1], [100, 100])
+        self.assertEqual(checked, [1, 3])
+
+    def test_normalise_stock_rows_keeps_every_row(self):
+        stock_file = PyMkmStandInCatalog(stock_size=2000).stock_file()
+        rows = list(csv.DictReader(io.StringIO(stock_file), delimiter=";"))
+
+        articles = list(PyMkmApp.normalise_stock_rows(rows))
+        self.assertEqual(len(articles), 2000)
+        for row, article in zip(rows, articles):
+            self.assertEqual(article["idArticle"], int(row["idArticle"]))
+            self.assertEqual(article["idProduct"], int(row["idProduct"]))
+            self.assertEqual(article["price"], float(row["Price"]))
+            self.assertEqual(article["condition"], row["Condition"])
+            self.assertEqual(article["product"]["enName"], row["English Name"])
+            self.assertEqual(article["product"]["expansion"], row["Exp. Name"])
+
+
+if __name__ == "__main__":
+    unittest.main()
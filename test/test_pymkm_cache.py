@@ -0,0 +1,94 @@
+"""
+Python unittest
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+from requests_oauthlib import OAuth1Session
+
+from pymkm.pymkm_cache import PyMkmResponseCache
+from pymkm.pymkmapi import PyMkmApi
+from test.test_common import FakeAsyncClient, MockResponse, TestCommon
+from test.test_pymkm_scheduler import FakeClock
+
+
+class TestPyMkmResponseCache(TestCommon):
+    def setUp(self):
+        super(TestPyMkmResponseCache, self).setUp()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "responses.db")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        super(TestPyMkmResponseCache, self).tearDown()
+
+    def test_entries_expire_after_ttl(self):
+        cache = PyMkmResponseCache(
+            self.filename, ttl={"products": 10}, clock=self.clock
+        )
+        cache.put("products", 1, {"product": {"idProduct": 1}})
+        self.assertEqual(cache.get("products", 1), {"product": {"idProduct": 1}})
+
+        self.clock.now += 11
+        self.assertIsNone(cache.get("products", 1))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        # Unknown resources are never cached
+        cache.put("orders", 1, {})
+        self.assertIsNone(cache.get("orders", 1))
+        cache.close()
+
+    def test_evicts_least_recently_used(self):
+        cache = PyMkmResponseCache(self.filename, max_entries=10, clock=self.clock)
+        cache.put_many("products", {i: {"idProduct": i} for i in range(10)})
+        self.clock.now += 1
+        cache.get("products", 0)
+        self.clock.now += 1
+        cache.put("products", 10, {"idProduct": 10})
+
+        found = cache.get_many("products", range(11))
+        self.assertEqual(len(found), 9)
+        self.assertIn(0, found)
+        self.assertIn(10, found)
+        cache.close()
+
+    def test_api_serves_products_from_cache(self):
+        self.config["api_cache_enabled"] = True
+        self.config["api_cache_filename"] = self.filename
+        api = PyMkmApi(self.config)
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(
+            return_value=MockResponse({"product": {"idProduct": 1}}, 200, "testing ok")
+        )
+
+        for i in range(3):
+            self.assertEqual(api.get_product(1, mock_oauth)["product"]["idProduct"], 1)
+        self.assertEqual(mock_oauth.get.call_count, 1)
+
+        api.get_product(1, mock_oauth, use_cache=False)
+        self.assertEqual(mock_oauth.get.call_count, 2)
+
+        fetched = []
+
+        def respond(product_id):
+            fetched.append(product_id)
+            return FakeAsyncClient.found(product_id)
+
+        with patch(
+            "pymkm.pymkmapi.AsyncOAuth1Client", FakeAsyncClient.answering(respond)
+        ):
+            result = asyncio.run(api.get_items("products", [2, 1, 3]))
+            self.assertEqual([x["product"]["idProduct"] for x in result], [2, 1, 3])
+            asyncio.run(api.get_items("products", [1, 2, 3]))
+        self.assertEqual(fetched, [2, 3])
+        api.cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Python unittest
+"""
+
+import statistics
+import unittest
+
+from pymkm.pymkm_calculators import (
+    AbstractPriceCalculator,
+    DefaultPriceCalculator,
+    PriceBatch,
+)
+from pymkm.pymkm_models import Article, Product
+
+
+class MedianTrendCalculator(AbstractPriceCalculator):
+    """Prices every article at the median trend of the batch."""
+
+    @classmethod
+    def calculate_prices(cls, batch):
+        median = statistics.median(
+            product["product"]["priceGuide"]["TREND"] for _, product in batch
+        )
+        return [median] * len(batch)
+
+
+class TestPyMkmCalculators(unittest.TestCase):
+    def setUp(self):
+        self.products = {
+            product_id: {
+                "product": {
+                    "idProduct": product_id,
+                    "rarity": rarity,
+                    "priceGuide": {"TREND": trend, "TRENDFOIL": 2 * trend},
+                }
+            }
+            for product_id, rarity, trend in [
+                (1, "Rare", 1.01),
+                (2, None, 3.33),
+                (3, "Common", 0.1),
+            ]
+        }
+        self.articles = [
+            Article(
+                idArticle=10 + i,
+                idProduct=product_id,
+                price=1.0,
+                count=1,
+                condition=condition,
+                isFoil=foil,
+                isPlayset="",
+                product=Product(enName="Card", expansion="Set", rarity="Mythic"),
+            )
+            for i, (product_id, condition, foil) in enumerate(
+                [(1, "NM", ""), (2, "EX", "X"), (3, "NM", ""), (1, "GD", "")]
+            )
+        ]
+        self.limits = []
+        self.batch = PriceBatch(
+            self.articles,
+            self.products,
+            {"NM": 1.0, "EX": 0.9, "GD": 0.5}.__getitem__,
+            self.rounding_limit,
+        )
+
+    def rounding_limit(self, rarity, product_id):
+        self.limits.append((rarity, product_id))
+        return 0.25
+
+    def test_default_batch_prices_articles_one_by_one(self):
+        self.assertEqual(
+            self.batch.calculate_price_arguments(self.articles[1], self.products[2]),
+            ("X", "", "EX", 0.9, 0.25, self.products[2]),
+        )
+        # no rarity in the product, the default limit is used
+        self.assertEqual(self.limits, [(None, 2)])
+
+        prices = AbstractPriceCalculator.calculate_prices.__func__(
+            DefaultPriceCalculator, self.batch
+        )
+        self.assertEqual(prices, [1.25, 6.0, 0.25, 0.75])
+        self.assertEqual(DefaultPriceCalculator.calculate_prices(self.batch), prices)
+
+    def test_custom_batch_calculator(self):
+        self.assertEqual(
+            MedianTrendCalculator().calculate_prices(self.batch), [1.01] * 4
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Python unittest
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from pymkm.pymkm_cassette import CassetteAdapter, PyMkmCassette
+from pymkm.pymkm_standin_server import PyMkmStandInCatalog, PyMkmStandInServer
+from pymkm.pymkmapi import PyMkmApi
+from test.test_common import TestCommon
+
+
+class TestPyMkmCassette(TestCommon):
+    def setUp(self):
+        super(TestPyMkmCassette, self).setUp()
+        # authlib refuses the stand-in's plain http URL otherwise
+        self.environ_patcher = patch.dict(
+            os.environ, {"AUTHLIB_INSECURE_TRANSPORT": "1"}
+        )
+        self.environ_patcher.start()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "cassette.jsonl.gz")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        self.environ_patcher.stop()
+        super(TestPyMkmCassette, self).tearDown()
+
+    def run_workload(self, config):
+        with PyMkmApi(config) as api:
+            account = api.get_account()
+            stock = api.get_stock()
+            products = api.get_items_async("products", [1, 2, 3])
+            result = api.set_stock([{"idArticle": 1, "price": 0.5}])
+        return account, stock, list(products), result, api
+
+    def test_records_and_replays_both_paths(self):
+        server = PyMkmStandInServer(PyMkmStandInCatalog(stock_size=150)).start()
+        self.config["base_url"] = server.base_url
+        self.config["api_cassette_filename"] = self.filename
+        self.config["api_cassette_mode"] = "record"
+        try:
+            recorded = self.run_workload(self.config)
+        finally:
+            server.stop()
+        requests_sent = server.request_count
+
+        self.config["api_cassette_mode"] = "replay"
+        replayed = self.run_workload(self.config)
+
+        self.assertEqual(replayed[:4], recorded[:4])
+        self.assertEqual(replayed[3]["updatedArticles"][0]["price"], 0.5)
+        self.assertEqual(len(replayed[4].cassette.interactions), requests_sent)
+        self.assertEqual(replayed[4].cassette.misses, 0)
+
+    def test_replay_speed_and_misses(self):
+        cassette = PyMkmCassette(self.filename, mode="record")
+        cassette.record(
+            "GET", "https://x/ws/products/1?b=2&a=1", None, 200, {}, b"{}", 0.2
+        )
+        cassette.save()
+
+        cassette = PyMkmCassette(self.filename, speed=2)
+        interaction = cassette.replay("GET", "http://y/ws/products/1?a=1&b=2")
+        self.assertEqual(cassette.delay(interaction), 0.1)
+        cassette.speed = 0
+        self.assertEqual(cassette.delay(interaction), 0.0)
+
+        session = requests.Session()
+        session.mount("https://", CassetteAdapter(cassette))
+        self.assertEqual(session.get("https://x/ws/products/1?a=1&b=2").json(), {})
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            session.get("https://x/ws/products/2")
+        self.assertEqual(cassette.misses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
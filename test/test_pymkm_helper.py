@@ -1,7 +1,10 @@
 """
 Python unittest
 """
+import array
 import io
+import os
+import tempfile
 import unittest
 import logging
 import re
@@ -55,6 +58,20 @@ class TestPyMkmHelperFunctions(unittest.TestCase):
         self.assertEqual(self.helper.string_to_float_or_int("11.3"), 11.3)
         self.assertEqual(self.helper.string_to_float_or_int(str(4 / 3)), 4 / 3)
 
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_ids_in_cache(self, mock_stdout):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "cache")
+            self.assertEqual(PyMkmHelper.read_ids_from_cache(filename, "ids"), set())
+            PyMkmHelper.add_ids_to_cache(filename, "ids", [5, 3])
+            self.assertEqual(PyMkmHelper.add_ids_to_cache(filename, "ids", [3, 1]), 3)
+
+            stored = PyMkmHelper.read_from_cache(filename, "ids")
+            self.assertEqual(stored, array.array("q", [1, 3, 5]))
+            self.assertEqual(
+                PyMkmHelper.read_ids_from_cache(filename, "ids"), {1, 3, 5}
+            )
+
     def test_calculate_average(self):
         table = [
             ["Yxskaft", "SE", "NM", 1, 1.21],
@@ -0,0 +1,83 @@
+"""
+Python unittest
+"""
+
+import array
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from pymkm.pymkm_local_store import PyMkmLocalStore
+
+
+class TestPyMkmLocalStore(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.store = PyMkmLocalStore.open(os.path.join(self.tempdir.name, "data.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tempdir.cleanup()
+
+    def test_stores_rows_per_item(self):
+        self.assertEqual(self.store.filename[-len("data.sqlite") :], "data.sqlite")
+        self.assertIs(
+            PyMkmLocalStore.open(os.path.join(self.tempdir.name, "data.db")),
+            self.store,
+        )
+        self.assertIsNone(self.store.read("stock"))
+        self.assertEqual(self.store.count("stock"), 0)
+
+        stock = [{"idArticle": i, "count": 1} for i in range(3)]
+        self.assertEqual(self.store.store("stock", stock), 3)
+        self.assertEqual(self.store.append("stock", [{"idArticle": 3}]), 4)
+        self.assertEqual(self.store.read("stock"), stock + [{"idArticle": 3}])
+        self.assertEqual(self.store.get("stock", 1), {"idArticle": 1, "count": 1})
+        self.assertIsNone(self.store.get("stock", 10))
+        self.assertEqual(self.store.count("stock"), 4)
+
+        # dicts keep their (int) keys
+        lists = {1: [{"idWant": "a"}], 2: []}
+        self.store.store("wantslists_lists", lists)
+        self.assertEqual(self.store.read("wantslists_lists"), lists)
+        self.assertEqual(self.store.get("wantslists_lists", 1), [{"idWant": "a"}])
+
+        self.assertEqual(self.store.add_ids("checked", [5, 3]), 2)
+        self.assertEqual(self.store.add_ids("checked", [3, 1]), 3)
+        self.assertEqual(self.store.read("checked"), array.array("q", [1, 3, 5]))
+        self.assertEqual(self.store.count("checked"), 3)
+
+        self.assertTrue(self.store.clear("stock"))
+        self.assertFalse(self.store.clear("stock"))
+        self.assertIsNone(self.store.read("stock"))
+
+    def test_failed_append_is_rolled_back(self):
+        self.store.store("stock", [{"idArticle": 1}])
+        with self.assertRaises(Exception):
+            self.store.append("stock", [{"idArticle": 2}, {"lock": threading.Lock()}])
+        self.assertEqual(self.store.read("stock"), [{"idArticle": 1}])
+        self.store.store("lists", {1: []})
+        with self.assertRaises(TypeError):
+            self.store.append("lists", [1])
+
+    def test_readers_see_last_commit_during_writes(self):
+        self.store.store("stock", [{"idArticle": 1}])
+        connection = self.store._PyMkmLocalStore__connect()
+        connection.execute("BEGIN")
+        connection.execute("DELETE FROM items WHERE label = 'stock'")
+
+        reader = sqlite3.connect(self.store.filename, timeout=0)
+        self.assertEqual(
+            reader.execute(
+                "SELECT COUNT(*) FROM items WHERE label = 'stock'"
+            ).fetchone(),
+            (1,),
+        )
+        reader.close()
+        connection.rollback()
+
+
+if __name__ == "__main__":
+    unittest.main()
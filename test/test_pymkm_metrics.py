@@ -0,0 +1,92 @@
+"""
+Python unittest
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from requests_oauthlib import OAuth1Session
+
+from pymkm.pymkm_metrics import PyMkmMetrics
+from pymkm.pymkmapi import PyMkmApi
+from test.test_common import TestCommon, MockResponse
+
+
+class TestPyMkmMetrics(TestCommon):
+    def test_groups_by_endpoint_family(self):
+        metrics = PyMkmMetrics(PyMkmApi.base_url)
+        self.assertEqual(metrics.family(f"{PyMkmApi.base_url}/products/1"), "products")
+        self.assertEqual(
+            metrics.family(f"{PyMkmApi.base_url}/products/find?search=x"), "products"
+        )
+        self.assertEqual(metrics.family(f"{PyMkmApi.base_url}/stock/101"), "stock")
+        self.assertEqual(
+            metrics.family(f"{PyMkmApi.base_url}/wantslist/3"), "wantslists"
+        )
+        self.assertEqual(
+            metrics.family(f"{PyMkmApi.base_url}/users/test/articles"), "articles"
+        )
+
+    def test_api_records_requests(self):
+        api = PyMkmApi(self.config)
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(
+            return_value=MockResponse({"product": {}}, 200, "testing ok")
+        )
+        api.get_product(1, mock_oauth)
+        api.get_product(2, mock_oauth)
+        mock_oauth.get = MagicMock(
+            return_value=MockResponse(
+                {"mkm_error_description": "Not found"}, 404, "not found"
+            )
+        )
+        api.get_metaproduct(3, mock_oauth)
+
+        data = api.metrics.to_dict()
+        products = data["endpoints"]["products"]
+        self.assertEqual(products["requests"], 2)
+        self.assertEqual(products["status_codes"], {"200": 2})
+        self.assertEqual(products["bytes_received"], 2 * len("testing ok"))
+        self.assertEqual(products["latency_seconds"]["histogram"]["+Inf"], 2)
+        self.assertEqual(data["endpoints"]["metaproducts"]["status_codes"], {"404": 1})
+        self.assertEqual(
+            data["quota"], {"count": 1234, "max": 5000, "consumed_this_run": 3}
+        )
+
+    def test_dumps_json_and_prometheus(self):
+        metrics = PyMkmMetrics(PyMkmApi.base_url)
+        metrics.record(f"{PyMkmApi.base_url}/stock", 200, 0.3, 100, 2000)
+        metrics.record_retry(f"{PyMkmApi.base_url}/stock")
+        metrics.record_quota(10, 5000)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            json_filename = os.path.join(tempdir, "metrics.json")
+            prom_filename = os.path.join(tempdir, "metrics.prom")
+            metrics.dump(json_filename)
+            metrics.dump(prom_filename)
+            with open(json_filename) as f:
+                data = json.load(f)
+            with open(prom_filename) as f:
+                prom = f.read()
+
+        self.assertEqual(data["endpoints"]["stock"]["retries"], 1)
+        self.assertEqual(
+            data["endpoints"]["stock"]["latency_seconds"]["histogram"]["0.25"], 0
+        )
+        self.assertEqual(
+            data["endpoints"]["stock"]["latency_seconds"]["histogram"]["0.5"], 1
+        )
+        self.assertIn("# TYPE pymkm_request_duration_seconds histogram", prom)
+        self.assertIn(
+            'pymkm_request_duration_seconds_bucket{endpoint="stock",le="0.5"} 1', prom
+        )
+        self.assertIn('pymkm_responses_total{endpoint="stock",code="200"} 1', prom)
+        self.assertIn('pymkm_bytes_received_total{endpoint="stock"} 2000', prom)
+        self.assertIn("pymkm_quota_max 5000", prom)
+
+
+if __name__ == "__main__":
+    unittest.main()
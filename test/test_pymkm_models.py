@@ -0,0 +1,62 @@
+"""
+Python unittest
+"""
+
+import pickle
+import sys
+import unittest
+
+from pymkm.pymkm_models import Article, Product
+
+
+class TestPyMkmModels(unittest.TestCase):
+    def setUp(self):
+        self.article = Article(
+            idArticle=1,
+            idProduct=100,
+            count=2,
+            price=1.5,
+            condition="".join(["N", "M"]),
+            product=Product(enName="Aether Vial", expansion="Darksteel"),
+        )
+
+    def test_used_like_a_dict(self):
+        self.assertEqual(self.article["idArticle"], 1)
+        self.assertEqual(self.article.idArticle, 1)
+        self.assertEqual(self.article["product"]["enName"], "Aether Vial")
+        self.assertIsNone(self.article.get("comments"))
+        self.assertFalse(self.article.get("isFoil", False))
+        self.assertNotIn("comments", self.article)
+        with self.assertRaises(KeyError):
+            self.article["comments"]
+        with self.assertRaises(KeyError):
+            self.article["unknown"] = 1
+        with self.assertRaises(TypeError):
+            Article(unknown=1)
+
+        self.article["comments"] = "!sticky"
+        del self.article["idArticle"]
+        self.assertEqual(
+            self.article,
+            {
+                "idProduct": 100,
+                "count": 2,
+                "comments": "!sticky",
+                "price": 1.5,
+                "condition": "NM",
+                "product": {"enName": "Aether Vial", "expansion": "Darksteel"},
+            },
+        )
+        self.assertIs(type(self.article.to_dict()["product"]), dict)
+        self.assertFalse(hasattr(self.article, "__dict__"))
+
+    def test_interned_and_pickled(self):
+        self.assertIs(self.article.condition, sys.intern("NM"))
+        copy = pickle.loads(pickle.dumps(self.article, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy, self.article)
+        self.assertIs(copy.condition, self.article.condition)
+        self.assertIs(copy.product.expansion, self.article.product.expansion)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Python unittest
+"""
+
+import base64
+import gzip
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from requests_oauthlib import OAuth1Session
+
+from pymkm.pymkm_priceguide import PyMkmPriceGuide
+from pymkm.pymkmapi import PyMkmApi
+from test.test_common import TestCommon, MockResponse
+
+
+class TestPyMkmPriceGuide(TestCommon):
+    price_guide_csv = (
+        '"idProduct","Avg. Sell Price","Low Price","Trend Price","German Pro Low",'
+        '"Suggested Price","Foil Sell","Foil Low","Foil Trend","Low Price Ex+",'
+        '"AVG1","AVG7","AVG30","Foil AVG1","Foil AVG7","Foil AVG30"\n'
+        '"1","0.35","0.02","0.22","","","1.53","0.1","1.71","0.05",'
+        '"0.1","0.3","0.37","1","1.74","1.72"\n'
+        '"2","2.5","1.2","2.2","","","","","","1.5","2","2.3","2.1","","",""\n'
+    )
+    product_list_csv = (
+        '"idProduct","Name","Category ID","Category","Expansion ID",'
+        '"Metacard ID","Date Added"\n'
+        '"1","Dragonlord Silumgar","1","Magic Single","1469","214658",'
+        '"2015-03-19 10:16:04"\n'
+        '"3","Booster Box","7","Magic Booster Box","1469","",""\n'
+    )
+
+    def test_lookup_has_api_shape(self):
+        price_guide = PyMkmPriceGuide(
+            PyMkmPriceGuide.read_csv(self.price_guide_csv),
+            PyMkmPriceGuide.read_csv(self.product_list_csv),
+        )
+        self.assertEqual(len(price_guide), 2)
+        self.assertNotIn(3, price_guide)
+        self.assertIsNone(price_guide.get(3))
+
+        product = price_guide.get(1)["product"]
+        self.assertEqual(product["enName"], "Dragonlord Silumgar")
+        self.assertEqual(product["priceGuide"]["TREND"], 0.22)
+        self.assertEqual(product["priceGuide"]["TRENDFOIL"], 1.71)
+        self.assertIsNone(product["priceGuide"]["GERMANPROLOW"])
+        self.assertIsNone(product["rarity"])
+
+        product = price_guide.get(2)["product"]
+        self.assertNotIn("enName", product)
+        self.assertIsNone(product["priceGuide"]["TRENDFOIL"])
+
+    def test_api_downloads_files(self):
+        def encode(text):
+            return base64.b64encode(gzip.compress(text.encode("utf-8"))).decode()
+
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(
+            side_effect=[
+                MockResponse(
+                    {"priceguidefile": encode(self.price_guide_csv), "idGame": 1},
+                    200,
+                    "testing ok",
+                ),
+                MockResponse(
+                    {"productsfile": encode(self.product_list_csv)}, 200, "testing ok"
+                ),
+            ]
+        )
+        api = PyMkmApi(self.config)
+        price_guide = api.get_price_guide(1, mock_oauth)
+
+        self.assertEqual(mock_oauth.get.call_count, 2)
+        self.assertEqual(price_guide.get(1)["product"]["enName"], "Dragonlord Silumgar")
+
+    def test_api_reads_local_files(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "price_guide.csv.gz")
+            with open(filename, "wb") as f:
+                f.write(gzip.compress(self.price_guide_csv.encode("utf-8")))
+            self.config["price_guide_filename"] = filename
+            price_guide = PyMkmApi(self.config).get_price_guide(1)
+
+        self.assertEqual(price_guide.get(2)["product"]["priceGuide"]["TREND"], 2.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
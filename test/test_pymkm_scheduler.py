@@ -0,0 +1,149 @@
+"""
+Python unittest
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from requests_oauthlib import OAuth1Session
+
+from pymkm.pymkm_scheduler import (
+    AdaptiveConcurrencyLimiter,
+    PyMkmRequestScheduler,
+    TokenBucket,
+)
+from pymkm.pymkmapi import PyMkmApi, QuotaExceededError
+from test.test_common import TestCommon, MockResponse
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_paces_after_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+
+        clock.now += 1
+        self.assertEqual(bucket.reserve(), 0)
+
+    def test_disabled_without_rate(self):
+        bucket = TokenBucket(rate=0)
+        for i in range(100):
+            self.assertEqual(bucket.reserve(), 0)
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    def test_grows_while_fine_and_backs_off_once_per_window(self):
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(initial=4, maximum=8, clock=clock)
+
+        async def request(overloaded=False, latency=0.1):
+            started = await limiter.acquire()
+            clock.now += latency
+            limiter.release(started, overloaded)
+
+        async def run():
+            for i in range(40):
+                await request()
+            grown = limiter.stats()["limit"]
+
+            # A burst of failures started before the backoff counts once
+            started = [await limiter.acquire() for i in range(3)]
+            clock.now += 1
+            for s in started:
+                limiter.release(s, overloaded=True)
+            after_errors = limiter.stats()["limit"]
+
+            # Latency far above the baseline counts as overload too
+            await request(latency=1.0)
+            return grown, after_errors, limiter.stats()
+
+        grown, after_errors, stats = asyncio.run(run())
+        self.assertEqual(grown, 8)
+        self.assertEqual(after_errors, 4)
+        self.assertEqual(stats["limit"], 2)
+        self.assertEqual(stats["decreases"], 2)
+        self.assertEqual(stats["overloaded"], 3)
+        self.assertEqual(stats["slow"], 1)
+
+    def test_caps_requests_in_flight(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, maximum=2)
+        in_flight = []
+
+        async def request():
+            started = await limiter.acquire()
+            in_flight.append(limiter.in_flight)
+            await asyncio.sleep(0.01)
+            limiter.release(started, None)
+
+        async def run():
+            await asyncio.gather(*[request() for i in range(10)])
+
+        asyncio.run(run())
+        self.assertEqual(len(in_flight), 10)
+        self.assertEqual(max(in_flight), 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+class TestPyMkmRequestScheduler(TestCommon):
+    def test_acquire_sleeps_for_pacing(self):
+        clock = FakeClock()
+        scheduler = PyMkmRequestScheduler(
+            requests_per_second=5, burst=1, clock=clock, sleep=clock.sleep
+        )
+        for i in range(6):
+            self.assertTrue(scheduler.acquire())
+        self.assertAlmostEqual(clock.now, 1.0)
+
+    def test_budget(self):
+        scheduler = PyMkmRequestScheduler(quota_reserve=10)
+        self.assertIsNone(scheduler.remaining_budget)
+        self.assertEqual(scheduler.allowed_calls(1000), 1000)
+
+        scheduler.update_quota(4900, 5000)
+        self.assertEqual(scheduler.remaining_budget, 90)
+        self.assertEqual(scheduler.allowed_calls(50), 50)
+        self.assertEqual(scheduler.allowed_calls(1000), 90)
+
+        scheduler.update_quota(4999, 5000)
+        self.assertTrue(scheduler.acquire())
+        self.assertFalse(scheduler.acquire())
+        self.assertFalse(asyncio.run(scheduler.acquire_async()))
+
+    def test_api_refuses_job_over_budget(self):
+        api = PyMkmApi(self.config)
+        api.scheduler.update_quota(4000, 5000)
+        self.assertEqual(api.reserve_quota(500, "test job"), 500)
+        with self.assertRaises(QuotaExceededError) as cm:
+            api.reserve_quota(2000, "test job")
+        self.assertEqual(cm.exception.allowed, 1000)
+
+    def test_api_stops_requests_when_depleted(self):
+        api = PyMkmApi(self.config)
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(return_value=MockResponse({}, 429, "quota"))
+
+        self.assertIsNone(api.get_product(1, mock_oauth))
+        self.assertEqual(mock_oauth.get.call_count, 1)
+
+        # The 429 marked the quota as depleted, nothing more is sent
+        self.assertIsNone(api.get_product(1, mock_oauth))
+        self.assertEqual(mock_oauth.get.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Python unittest
+"""
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pymkm.pymkm_session import PyMkmSession, PyMkmSessionManager
+from pymkm.pymkmapi import PyMkmApi
+from test.test_common import TestCommon
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps(
+            {"path": self.path, "auth": self.headers.get("Authorization")}
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPyMkmSessionManager(TestCommon):
+    def setUp(self):
+        super(TestPyMkmSessionManager, self).setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super(TestPyMkmSessionManager, self).tearDown()
+
+    def test_connections_are_reused(self):
+        manager = PyMkmSessionManager(self.config, pool_size=2)
+        for i in range(5):
+            r = manager.session_for(f"{self.url}/products/{i}").get(
+                f"{self.url}/products/{i}"
+            )
+            self.assertEqual(r.json()["path"], f"/products/{i}")
+        stats = manager.stats()
+        manager.close()
+
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(stats["reused_connections"], 4)
+        self.assertEqual(stats["reuse_rate"], 0.8)
+        self.assertEqual(stats["open_connections"], 1)
+
+    def test_realm_is_signed_per_url(self):
+        manager = PyMkmSessionManager(self.config)
+        realm = f"{self.url}/account"
+        r = manager.session_for(realm).get(realm)
+        manager.close()
+
+        auth_header = r.json()["auth"]
+        self.assertIn(f'realm="{realm}"', auth_header)
+        self.assertIn(f'oauth_consumer_key="{self.config["app_token"]}"', auth_header)
+
+    def test_api_uses_pooled_sessions(self):
+        api = PyMkmApi(self.config)
+        self.assertIsInstance(
+            api._PyMkmApi__setup_auth_session("test url"), PyMkmSession
+        )
+        self.assertEqual(api.get_connection_stats()["requests"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
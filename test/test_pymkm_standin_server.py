@@ -0,0 +1,67 @@
+"""
+Python unittest
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from pymkm.pymkm_standin_server import PyMkmStandInCatalog, PyMkmStandInServer
+from pymkm.pymkmapi import PyMkmApi
+from test.test_common import TestCommon
+
+
+class TestPyMkmStandInServer(TestCommon):
+    def setUp(self):
+        super(TestPyMkmStandInServer, self).setUp()
+        # authlib refuses the stand-in's plain http URL otherwise
+        self.environ_patcher = patch.dict(
+            os.environ, {"AUTHLIB_INSECURE_TRANSPORT": "1"}
+        )
+        self.environ_patcher.start()
+        self.server = PyMkmStandInServer(
+            PyMkmStandInCatalog(num_products=100000, stock_size=450)
+        ).start()
+        self.config["base_url"] = self.server.base_url
+        self.api = PyMkmApi(self.config)
+
+    def tearDown(self):
+        self.api.close()
+        self.server.stop()
+        self.environ_patcher.stop()
+        super(TestPyMkmStandInServer, self).tearDown()
+
+    def test_paginates_stock_and_reports_quota(self):
+        stock = self.api.get_stock()
+        self.assertEqual([x["idArticle"] for x in stock], list(range(1, 451)))
+        self.assertEqual(self.api.requests_max, 5000)
+        self.assertEqual(self.server.request_count, 5)
+
+        stock_file = self.api.get_stock_file()
+        self.assertEqual(len(stock_file), 450)
+        self.assertEqual(stock_file[0]["idArticle"], "1")
+
+    def test_batches_and_writes_end_to_end(self):
+        products = self.api.get_items_async("products", list(range(1, 301)))
+        self.assertEqual(len(products), 300)
+        self.assertFalse(products.failures)
+        self.assertEqual(products[99]["product"]["idProduct"], 100)
+
+        result = self.api.set_stock(
+            [{"idArticle": 1, "price": 0.5}, {"idArticle": 99999, "price": 1}]
+        )
+        self.assertEqual(result["updatedArticles"][0]["price"], 0.5)
+        self.assertEqual(len(result["notUpdatedArticles"]), 1)
+
+    def test_injected_errors_and_quota(self):
+        self.server.error_rate = 1.0
+        products = self.api.get_items_async("products", [1, 2])
+        self.assertEqual(products.failures, {1: "HTTP 503", 2: "HTTP 503"})
+
+        self.server.error_rate = 0.0
+        self.server.request_limit = self.server.request_count
+        self.assertIsNone(self.api.get_product(1, use_cache=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Python unittest
+"""
+
+import random
+import unittest
+
+from pymkm.pymkm_calculators import DefaultPriceCalculator
+from pymkm.pymkm_models import Article, Product
+from pymkm.pymkm_stock_table import PyMkmStockTable
+
+
+@unittest.skipUnless(PyMkmStockTable.available(), "needs NumPy")
+class TestPyMkmStockTable(unittest.TestCase):
+    discounts = {"NM": 1.0, "EX": 0.9, "GD": 0.75}
+    limits = {None: 0.25, "rare": 0.5, "common": 0.02}
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.products = {}
+        self.articles = []
+        for i in range(2000):
+            product_id = rng.randrange(300)
+            self.products.setdefault(
+                product_id,
+                {
+                    "product": {
+                        "idProduct": product_id,
+                        "rarity": rng.choice([None, "rare", "common"]),
+                        "priceGuide": {
+                            "TREND": round(rng.uniform(0.02, 40), 2),
+                            "TRENDFOIL": round(rng.uniform(0.02, 80), 2),
+                        },
+                    }
+                },
+            )
+            self.articles.append(
+                Article(
+                    idArticle=i,
+                    idProduct=product_id,
+                    count=rng.randint(1, 4),
+                    price=rng.choice([0.25, 0.5, round(rng.uniform(0.02, 40), 2)]),
+                    condition=rng.choice(list(self.discounts)),
+                    isFoil=rng.choice(["", "X"]),
+                    isPlayset=rng.choice(["", "X"]),
+                    product=Product(enName=f"Card {i}", expansion="Set"),
+                )
+            )
+
+    def rounding_limit(self, rarity, product_id):
+        return self.limits[rarity]
+
+    def test_prices_match_default_calculator(self):
+        table = PyMkmStockTable(self.articles, self.products)
+        new_prices = table.calculate_prices(self.discounts.get, self.rounding_limit)
+
+        expected = [
+            DefaultPriceCalculator.calculate_price(
+                article["isFoil"],
+                article["isPlayset"],
+                article["condition"],
+                self.discounts[article["condition"]],
+                self.limits[self.products[article["idProduct"]]["product"]["rarity"]],
+                self.products[article["idProduct"]],
+            )
+            for article in self.articles
+        ]
+        self.assertEqual(new_prices.tolist(), expected)
+
+    def test_price_changes_and_stock_value(self):
+        table = PyMkmStockTable(self.articles[:4], self.products)
+        old_prices = [article["price"] for article in self.articles[:4]]
+        new_prices = [old_prices[0], old_prices[1] + 1, 0, None]
+
+        changed, price_diffs = table.price_changes(new_prices)
+        self.assertEqual(changed.tolist(), [1])
+        self.assertAlmostEqual(price_diffs[0], 1)
+        self.assertAlmostEqual(
+            table.stock_value(new_prices),
+            sum(
+                (price + (i == 1)) * article["count"]
+                for i, (price, article) in enumerate(zip(old_prices, self.articles))
+            ),
+        )
+
+    def test_missing_trend_price(self):
+        self.products[self.articles[0]["idProduct"]]["product"]["priceGuide"][
+            "TREND"
+        ] = None
+        self.articles[0]["isFoil"] = ""
+        table = PyMkmStockTable(self.articles, self.products)
+        with self.assertRaises(ValueError):
+            table.calculate_prices(self.discounts.get, self.rounding_limit)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,31 @@
 """
 Python unittest
 """
+import asyncio
+import base64
+import gzip
 import io
+import itertools
 import json
+import os
+import re
+import tempfile
+import threading
 import unittest
 from unittest.mock import MagicMock, Mock, mock_open, patch
 
+import httpx
+import requests
 from requests_oauthlib import OAuth1Session
 
-from pymkm.pymkmapi import PyMkmApi, CardmarketError
+from pymkm.pymkmapi import PyMkmApi, BatchResultDict, CardmarketError
 from pymkm.pymkm_app import PyMkmApp
-from test.test_common import TestCommon, MockResponse, MockRequest
+from test.test_common import (
+    FakeAsyncClient,
+    MockRequest,
+    MockResponse,
+    TestCommon,
+)
 
 
 class TestPyMkmApi(TestCommon):
@@ -84,6 +99,58 @@ class TestPyMkmApi(TestCommon):
         stock = self.api.get_stock(None, mock_oauth)
         self.assertEqual(stock[0]["comments"], "x")
 
+    def test_get_stock_file_parses_in_memory(self):
+        stock_csv = (
+            ";".join(f'"{x}"' for x in PyMkmApi.stock_csv_fieldnames)
+            + "\r\n"
+            + '"1";"100";"Aether; Vial";"\\u00c6ther Vial";"DST";"Darksteel";"1.5";"1";"NM";'
+            + '"";"";"";"";"";"2";"0";"1";"EUR"\r\n'
+        )
+        encoded = base64.b64encode(gzip.compress(stock_csv.encode("utf-8")))
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(
+            return_value=MockResponse({"stock": encoded.decode()}, 200, "testing ok")
+        )
+
+        stock = self.api.get_stock_file(provided_oauth=mock_oauth)
+        self.assertEqual(len(stock), 1)
+        self.assertEqual(stock[0]["English Name"], "Aether; Vial")
+        self.assertEqual(stock[0]["Local Name"], "\u00c6ther Vial")
+        self.assertEqual(stock[0]["Amount"], "2")
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            self.api.config["stock_csv_filename"] = os.path.join(tempdir, "stock.csv")
+            self.api.get_stock_file(provided_oauth=mock_oauth)
+            with open(self.api.config["stock_csv_filename"], encoding="utf-8") as f:
+                self.assertIn("\u00c6ther Vial", f.read())
+
+    def test_stock_file_streams_across_chunk_boundaries(self):
+        data = gzip.compress(
+            "".join(f"{i};c\\u00e9 {i * 7919}\r\n" for i in range(1000)).encode()
+        )
+        encoded = base64.b64encode(data).decode()
+        chunks = list(PyMkmApi._iter_decoded_file(encoded, chunk_size=10))
+        self.assertGreater(len(chunks), 100)
+        self.assertEqual(b"".join(chunks), gzip.decompress(data))
+
+        # the response read in chunks, with "/" escaped like the API does
+        body = ('{"stock" : "%s", "x": 1}' % encoded.replace("/", "\\/")).encode()
+        for size in (1, 2, 3, 7, 1000):
+            chunks = (body[i : i + size] for i in range(0, len(body), size))
+            value = b"".join(PyMkmApi._iter_json_string(chunks, "stock"))
+            self.assertEqual(value, encoded.encode())
+        body = b'{"a": "\\\\", "stock": "x\\\\y"}'
+        value = PyMkmApi._iter_json_string([body], "stock")
+        self.assertEqual(b"".join(value), b"x\\y")
+
+        lines = PyMkmApi._iter_lines([b"a;b\r", b"\nc\\u00", b"e9;d\n", b"e"])
+        self.assertEqual(list(lines), ["a;b\r\n", "c\u00e9;d\n", "e"])
+        # the escape split at every possible position
+        line = b"c\\u00e9;d\n"
+        for split in range(1, len(line)):
+            lines = PyMkmApi._iter_lines([line[:split], line[split:]])
+            self.assertEqual(list(lines), ["c\u00e9;d\n"])
+
     def test_get_orders(self):
         mock_oauth = Mock(spec=OAuth1Session)
         mock_oauth.get = MagicMock(
@@ -222,6 +289,163 @@ class TestPyMkmApi(TestCommon):
         result = self.api.find_user_articles(user_id, mock_oauth)
         self.assertEqual(result[0]["comments"], "x")
 
+    def test_get_stock_fetches_pages_concurrently_in_order(self):
+        calls = {}
+
+        def paged_response(url, params=None, **kwargs):
+            start = params["start"]
+            calls[start] = calls.get(start, 0) + 1
+            if start == 201 and calls[start] == 1:
+                # First attempt on this page fails, it should be retried alone
+                return MockResponse(None, 500, "server error")
+            page = [{"idArticle": i} for i in range(start, min(start + 100, 251))]
+            response = MockResponse({"article": page}, 206, "partial content")
+            response.headers["Content-Range"] = f"{start}-{start + 99}/250"
+            return response
+
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(side_effect=paged_response)
+
+        with patch.object(self.api, "_retry_delay", return_value=0) as retry_delay:
+            stock = self.api.get_stock(1, mock_oauth)
+        self.assertEqual([x["idArticle"] for x in stock], list(range(1, 251)))
+        self.assertEqual(calls, {1: 1, 101: 1, 201: 2})
+        # The failed page is retried after a backoff
+        retry_delay.assert_called_once_with(1)
+
+    def test_get_stock_raises_when_a_page_keeps_failing(self):
+        def paged_response(url, params=None, **kwargs):
+            start = params["start"]
+            if start == 101:
+                return MockResponse(None, 503, "maintenance")
+            page = [{"idArticle": i} for i in range(start, min(start + 100, 251))]
+            response = MockResponse({"article": page}, 206, "partial content")
+            response.headers["Content-Range"] = f"{start}-{start + 99}/250"
+            return response
+
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(side_effect=paged_response)
+
+        with self.assertRaisesRegex(CardmarketError, "articles 101-200"):
+            self.api.get_stock(1, mock_oauth)
+
+    def test_iter_stock_streams_pages(self):
+        requested_starts = []
+
+        def paged_response(url, params=None, **kwargs):
+            start = params["start"]
+            requested_starts.append(start)
+            page = [{"idArticle": i} for i in range(start, start + 100)]
+            response = MockResponse({"article": page}, 206, "partial content")
+            response.headers["Content-Range"] = f"{start}-{start + 99}/10000"
+            return response
+
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.get = MagicMock(side_effect=paged_response)
+
+        stock_iterator = self.api.iter_stock(1, mock_oauth)
+        first_articles = list(itertools.islice(stock_iterator, 150))
+        stock_iterator.close()
+
+        self.assertEqual([x["idArticle"] for x in first_articles], list(range(1, 151)))
+        self.assertLess(len(requested_starts), 100)
+
+    def test_get_items_retries_and_reports_failures(self):
+        attempts = {}
+
+        def respond(product_id):
+            attempts[product_id] = attempts.get(product_id, 0) + 1
+            if product_id == 2 and attempts[product_id] <= 2:
+                raise httpx.ReadTimeout("timed out")
+            if product_id == 3:
+                return httpx.Response(404, json={"error": "not found"})
+            if product_id == 4:
+                return httpx.Response(503, text="maintenance")
+            return FakeAsyncClient.found(product_id)
+
+        client = FakeAsyncClient.answering(respond)
+        self.api.config["api_async_retries"] = 1
+        self.api.config["api_async_backoff"] = 0
+        with patch("pymkm.pymkmapi.AsyncOAuth1Client", client):
+            result = asyncio.run(self.api.get_items("products", [1, 2, 3, 4]))
+
+        self.assertEqual([x["product"]["idProduct"] for x in result], [1, 2])
+        self.assertEqual(result.failures, {3: "HTTP 404", 4: "HTTP 503"})
+        # 2 and 4 are retried once in the batch and again in the straggler pass
+        self.assertEqual(attempts, {1: 1, 2: 3, 3: 1, 4: 4})
+
+        with patch("pymkm.pymkmapi.AsyncOAuth1Client", client):
+            result = asyncio.run(self.api.get_items("products", [1, 3], as_dict=True))
+        self.assertEqual(list(result), [1])
+        self.assertEqual(result.failures, {3: "HTTP 404"})
+
+    def test_get_items_coalesces_duplicate_and_concurrent_ids(self):
+        attempts = {}
+
+        async def respond(product_id):
+            attempts[product_id] = attempts.get(product_id, 0) + 1
+            await asyncio.sleep(0.01)
+            return FakeAsyncClient.found(product_id)
+
+        async def run():
+            return await asyncio.gather(
+                self.api.get_items("products", [1, 2, 1, 1]),
+                self.api.get_items("products", [2, 3, 2], as_dict=True),
+            )
+
+        with patch(
+            "pymkm.pymkmapi.AsyncOAuth1Client", FakeAsyncClient.answering(respond)
+        ):
+            first, second = asyncio.run(run())
+
+        self.assertEqual(attempts, {1: 1, 2: 1, 3: 1})
+        self.assertEqual([x["product"]["idProduct"] for x in first], [1, 2, 1, 1])
+        self.assertIsInstance(second, BatchResultDict)
+        self.assertEqual(
+            second,
+            {2: {"product": {"idProduct": 2}}, 3: {"product": {"idProduct": 3}}},
+        )
+
+    def test_get_items_on_concurrent_event_loops(self):
+        async def respond(product_id):
+            await asyncio.sleep(0.02)
+            return FakeAsyncClient.found(product_id)
+
+        results = {}
+        started = threading.Barrier(2)
+
+        def run(name):
+            started.wait()
+            results[name] = asyncio.run(
+                self.api.get_items("products", [1, 2, 3], use_cache=False)
+            )
+
+        with patch(
+            "pymkm.pymkmapi.AsyncOAuth1Client", FakeAsyncClient.answering(respond)
+        ):
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        for i in range(2):
+            self.assertEqual([x["product"]["idProduct"] for x in results[i]], [1, 2, 3])
+        self.assertEqual(self.api._PyMkmApi__in_flight, {})
+
+    def test_get_items_latency_excludes_request_pacing(self):
+        async def slow_token():
+            await asyncio.sleep(0.05)
+            return True
+
+        self.api.scheduler.acquire_async = slow_token
+        with patch("pymkm.pymkmapi.AsyncOAuth1Client", FakeAsyncClient):
+            asyncio.run(self.api.get_items("products", [1, 2, 3]))
+
+        stats = self.api.get_concurrency_stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertLess(stats["baseline_latency"], 0.05)
+
     def test_set_vacation_status(self):
         mock_oauth = Mock(spec=OAuth1Session)
         mock_oauth.put = MagicMock(
@@ -271,20 +495,121 @@ class TestPyMkmApi(TestCommon):
     def test_set_stock(self):
         mock_oauth = Mock(spec=OAuth1Session)
         mock_oauth.put = MagicMock(
-            return_value=MockResponse(TestCommon.get_stock_result, 200, "testing ok")
+            return_value=MockResponse(
+                {
+                    "updatedArticles": TestCommon.get_stock_result,
+                    "notUpdatedArticles": [],
+                },
+                200,
+                "testing ok",
+            )
         )
 
         result = self.api.set_stock(TestCommon.get_stock_result, mock_oauth)
-        self.assertEqual(len(result), 3)
+        self.assertEqual(len(result["updatedArticles"]), 3)
+        self.assertEqual(result["notUpdatedArticles"], [])
+
+    def test_set_stock_aggregates_chunks_and_requeues_failures(self):
+        payload = [{"idArticle": i, "price": 1.0} for i in range(250)]
+
+        failed_once = []
+
+        def put_response(url, data=None, **kwargs):
+            ids = [int(x) for x in re.findall(r"<idArticle>(\d+)</idArticle>", data)]
+            if 100 in ids and not failed_once:
+                # The whole chunk fails the first time
+                failed_once.append(ids)
+                return MockResponse(None, 503, "maintenance")
+            updated = [
+                {"idArticle": i, "idProduct": 1, "product": {"enName": "x"}}
+                for i in ids
+                if i != 7
+            ]
+            not_updated = [
+                {"success": False, "tried": {"idArticle": 7}, "error": "Invalid price"}
+                for i in ids
+                if i == 7
+            ]
+            return MockResponse(
+                {"updatedArticles": updated, "notUpdatedArticles": not_updated},
+                200,
+                "testing ok",
+            )
+
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.put = MagicMock(side_effect=put_response)
+
+        result = self.api.set_stock(payload, mock_oauth)
+        self.assertEqual(
+            sorted(x["idArticle"] for x in result["updatedArticles"]),
+            [i for i in range(250) if i != 7],
+        )
+        self.assertEqual(len(result["notUpdatedArticles"]), 1)
+        self.assertEqual(result["notUpdatedArticles"][0]["error"], "Invalid price")
+        # 3 chunks, then the failed chunk again, the rejected article is not
+        self.assertEqual(mock_oauth.put.call_count, 4)
+        # the chunks went through the shared limiter, which backed off on the 503
+        stats = self.api.get_concurrency_stats()
+        self.assertEqual(stats["requests"], 4)
+        self.assertEqual(stats["decreases"], 1)
+
+    def test_failed_post_and_delete_chunks_are_not_resent(self):
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.post = MagicMock(side_effect=requests.exceptions.Timeout("slow"))
+        mock_oauth.delete = MagicMock(return_value=MockResponse(None, 503, "down"))
+
+        result = self.api.add_stock(TestCommon.get_stock_result, mock_oauth)
+        self.assertEqual(mock_oauth.post.call_count, 1)
+        self.assertEqual(len(result["inserted"]), 3)
+        self.assertFalse(any(x["success"] for x in result["inserted"]))
+
+        result = self.api.delete_stock(TestCommon.get_stock_result, mock_oauth)
+        self.assertEqual(mock_oauth.delete.call_count, 1)
+        self.assertEqual([x["message"] for x in result["deleted"]], ["HTTP 503"] * 3)
+
+    def test_rejected_articles_are_not_resent(self):
+        mock_oauth = Mock(spec=OAuth1Session)
+        mock_oauth.post = MagicMock(
+            return_value=MockResponse(
+                {
+                    "inserted": [
+                        {"success": False, "tried": x, "error": "Invalid price"}
+                        for x in TestCommon.get_stock_result
+                    ]
+                },
+                200,
+                "testing ok",
+            )
+        )
+        mock_oauth.put = MagicMock(return_value=MockResponse(None, 400, "bad"))
+
+        result = self.api.add_stock(TestCommon.get_stock_result, mock_oauth)
+        self.assertEqual(mock_oauth.post.call_count, 1)
+        self.assertEqual(
+            [x["error"] for x in result["inserted"]], ["Invalid price"] * 3
+        )
+
+        result = self.api.set_stock(TestCommon.get_stock_result, mock_oauth)
+        self.assertEqual(mock_oauth.put.call_count, 1)
+        self.assertEqual(len(result["notUpdatedArticles"]), 3)
 
     def test_delete_stock(self):
         mock_oauth = Mock(spec=OAuth1Session)
         mock_oauth.delete = MagicMock(
-            return_value=MockResponse(TestCommon.get_stock_result, 200, "testing ok")
+            return_value=MockResponse(
+                {
+                    "deleted": [
+                        {"success": True, "idArticle": x["idArticle"], "count": 1}
+                        for x in TestCommon.get_stock_result
+                    ]
+                },
+                200,
+                "testing ok",
+            )
         )
 
         result = self.api.delete_stock(TestCommon.get_stock_result, mock_oauth)
-        self.assertEqual(len(result), 3)
+        self.assertEqual(len(result["deleted"]), 3)
 
     def test_get_wantslists(self):
         mock_oauth = Mock(spec=OAuth1Session)
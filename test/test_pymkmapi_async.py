@@ -0,0 +1,160 @@
+"""
+Python unittest
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import httpx
+from authlib.integrations.httpx_client import AsyncOAuth1Client
+
+from pymkm.pymkmapi import CardmarketError, PyMkmApi
+from pymkm.pymkmapi_async import AsyncPyMkmApi
+from test.test_common import TestCommon
+
+
+class TestAsyncPyMkmApi(TestCommon):
+    def setUp(self):
+        super(TestAsyncPyMkmApi, self).setUp()
+        self.requests = []
+        self.clients = []
+        self.failing_starts = set()
+
+        def client_factory(**kwargs):
+            client = AsyncOAuth1Client(
+                transport=httpx.MockTransport(self.handle_request), **kwargs
+            )
+            self.clients.append(client)
+            return client
+
+        self.patcher = patch("pymkm.pymkmapi.AsyncOAuth1Client", client_factory)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        super(TestAsyncPyMkmApi, self).tearDown()
+
+    def handle_request(self, request):
+        self.requests.append(request)
+        headers = {"X-Request-Limit-Count": "10", "X-Request-Limit-Max": "5000"}
+        path = request.url.path
+        if path.endswith("/account"):
+            return httpx.Response(
+                200, json=TestCommon.fake_account_data, headers=headers
+            )
+        match = re.search(r"/stock/(\d+)$", path)
+        if match:
+            start = int(match.group(1))
+            if start in self.failing_starts:
+                return httpx.Response(503, text="maintenance", headers=headers)
+            end = min(start + 99, 250)
+            headers["Content-Range"] = f"{start}-{end}/250"
+            return httpx.Response(
+                206,
+                json={"article": [{"idArticle": i} for i in range(start, end + 1)]},
+                headers=headers,
+            )
+        if path.endswith("/stock") and request.method == "PUT":
+            return httpx.Response(
+                200,
+                json={
+                    "updatedArticles": [
+                        {"idArticle": 1, "idProduct": 2, "product": {"enName": "Test"}}
+                    ],
+                    "notUpdatedArticles": [],
+                },
+                headers=headers,
+            )
+        return httpx.Response(404, json={"error": "not found"}, headers=headers)
+
+    def test_runs_operations_concurrently_on_one_client(self):
+        async def run():
+            async with AsyncPyMkmApi(self.config) as api:
+                account, stock = await asyncio.gather(
+                    api.get_account(), api.get_stock()
+                )
+                result = await api.set_stock([{"idArticle": 1, "price": 1.0}])
+            return account, stock, result
+
+        account, stock, result = asyncio.run(run())
+
+        self.assertEqual(account["account"]["username"], "test")
+        self.assertEqual([x["idArticle"] for x in stock], list(range(1, 251)))
+        self.assertEqual(result["updatedArticles"][0]["idArticle"], 1)
+        self.assertEqual(len(self.clients), 1)
+        self.assertEqual(len(self.requests), 5)
+        self.assertIn(
+            'realm="https://api.cardmarket.com/ws/v2.0/output.json/account"',
+            self.requests[0].headers["Authorization"],
+        )
+        put = self.requests[-1]
+        self.assertEqual(put.method, "PUT")
+        self.assertIn(b"<idArticle>1</idArticle>", put.content)
+        self.assertIn(
+            'realm="https://api.cardmarket.com/ws/v2.0/output.json/stock"',
+            put.headers["Authorization"],
+        )
+
+    def test_sync_api_reuses_one_client_across_batches(self):
+        with PyMkmApi(self.config) as api:
+            first = api.get_items_async("products", [1, 2])
+            second = api.get_items_async("products", [3])
+
+            async def inside_running_loop():
+                return api.get_items_async("products", [4])
+
+            third = asyncio.run(inside_running_loop())
+
+        self.assertEqual(len(self.clients), 1)
+        self.assertEqual(first.failures, {1: "HTTP 404", 2: "HTTP 404"})
+        self.assertEqual(list(second.failures), [3])
+        self.assertEqual(list(third.failures), [4])
+        self.assertIsNone(api.async_client)
+
+    def test_page_that_keeps_failing_raises(self):
+        self.failing_starts.add(101)
+        self.config["api_page_retries"] = 1
+
+        async def run():
+            async with AsyncPyMkmApi(self.config) as api:
+                await api.get_stock()
+
+        with patch.object(PyMkmApi, "_retry_delay", return_value=0) as retry_delay:
+            with self.assertRaisesRegex(CardmarketError, "articles 101-200"):
+                asyncio.run(run())
+        # The failed page is retried after a backoff
+        retry_delay.assert_called_once_with(1)
+
+    def test_aclose_closes_only_its_own_api(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            metrics_filename = os.path.join(tempdir, "metrics.json")
+            self.config["metrics_filename"] = metrics_filename
+
+            async def run(api=None):
+                async with AsyncPyMkmApi(self.config, api=api) as async_api:
+                    await async_api.get_account()
+
+            shared_api = PyMkmApi(self.config)
+            asyncio.run(run(shared_api))
+            self.assertFalse(os.path.exists(metrics_filename))
+
+            asyncio.run(run())
+            with open(metrics_filename) as f:
+                self.assertIn("account", f.read())
+            shared_api.close()
+
+    def test_reads_quota_from_headers(self):
+        async def run():
+            async with AsyncPyMkmApi(self.config) as api:
+                await api.get_account()
+                return api.scheduler.remaining_budget
+
+        self.assertEqual(asyncio.run(run()), 4990)
+
+
+if __name__ == "__main__":
+    unittest.main()